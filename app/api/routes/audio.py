@@ -1,18 +1,66 @@
 from pathlib import Path
 
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 
 from ...config import settings
+from ...schemas import ChapterAudioIndex, ChapterAudioStatus
+from ...services.audiobook import chapter_audio_service
+from ...services.storage_manager import storage_manager
+from ..utils import file_response
 
 router = APIRouter()
 
 
 @router.get("/audio/{filename}")
-def stream_audio(filename: str):
+def stream_audio(filename: str, request: Request):
     safe_name = Path(filename).name
-    audio_path = settings.tts_root / safe_name
-    if not audio_path.exists():
+    audio_path = Path(settings.tts_output_path) / safe_name
+    if not audio_path.is_file():
         raise HTTPException(status_code=404, detail="Audio file not found")
-    media_type = "audio/wav" if settings.audio_format == "wav" else "audio/mpeg"
-    return FileResponse(audio_path, media_type=media_type, filename=safe_name)
+    storage_manager.touch(audio_path)
+    return file_response(request, audio_path)
+
+
+def _chapter_status(book_id: str, chapter_id: str) -> ChapterAudioStatus:
+    try:
+        status, error = chapter_audio_service.status(book_id, chapter_id)
+        index = chapter_audio_service.load_index(book_id, chapter_id) if status == "ready" else None
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail="Book content not found") from exc
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail="Chapter not found") from exc
+    return ChapterAudioStatus(
+        book_id=book_id,
+        chapter_id=chapter_id,
+        status=status,
+        error=error,
+        index=ChapterAudioIndex(**index) if index else None,
+    )
+
+
+@router.post("/books/{book_id}/chapters/{chapter_id}/audio", response_model=ChapterAudioStatus, status_code=202)
+async def build_chapter_audio(book_id: str, chapter_id: str, response: Response):
+    # The status check reads the TOC and index from disk; keep it off the event loop
+    status = await run_in_threadpool(_chapter_status, book_id, chapter_id)
+    if status.status == "ready":
+        response.status_code = 200
+        return status
+    chapter_audio_service.start_build(book_id, chapter_id)
+    return status.copy(update={"status": "building", "error": None})
+
+
+@router.get("/books/{book_id}/chapters/{chapter_id}/audio/index", response_model=ChapterAudioStatus)
+def read_chapter_audio_index(book_id: str, chapter_id: str):
+    return _chapter_status(book_id, chapter_id)
+
+
+@router.get("/books/{book_id}/chapters/{chapter_id}/audio")
+def stream_chapter_audio(book_id: str, chapter_id: str, request: Request):
+    status = _chapter_status(book_id, chapter_id)
+    if status.status != "ready":
+        raise HTTPException(status_code=404, detail=f"Chapter audio is {status.status}")
+    audio_path, _ = chapter_audio_service.paths(book_id, chapter_id)
+    storage_manager.touch(audio_path)
+    # Rebuilt in place when the voice changes, so revalidate instead of caching forever
+    return file_response(request, audio_path, cache_control="no-cache")
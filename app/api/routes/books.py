@@ -1,100 +1,213 @@
-import uuid
 from pathlib import Path
+from typing import Optional
 
-from fastapi import APIRouter, File, HTTPException, UploadFile
+from fastapi import APIRouter, File, Header, HTTPException, Query, Request, Response, UploadFile
 from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
 
-from ...database import get_session
+from ...config import settings
+from ...database import get_async_session, get_session
 from ...schemas import (
     BookDetailResponse,
     BookListResponse,
-    BookStructure,
+    BookTOCResponse,
+    Chapter,
+    ChapterResponse,
+    ImportJobResponse,
     ProgressUpdate,
+    TableOfContents,
 )
 from ...services.books import book_service
-from ...services.ingestion import ingestion_service
+from ...services.jobs import ingestion_jobs
+from ...services.prefetch import tts_prefetcher
+from ...services.progress import progress_buffer
+from ...services.singleflight import async_file_lock
 from ...services.storage import storage_service
-from ..utils import serialize_book
+from ..utils import (
+    cached_json_response,
+    etag_matches,
+    make_etag,
+    not_modified,
+    serialize_book,
+    serialize_job,
+    set_etag,
+)
 
 router = APIRouter()
 
 SUPPORTED_EXTENSIONS = {".pdf", ".epub", ".txt", ".docx", ".md"}
 
 
-@router.post("/books/import", response_model=BookDetailResponse)
-async def import_book(file: UploadFile = File(...)):
+@router.post("/books/import", response_model=ImportJobResponse, status_code=202)
+async def import_book(response: Response, file: UploadFile = File(...)):
     if not file.filename:
         raise HTTPException(status_code=400, detail="Filename missing")
     suffix = Path(file.filename).suffix.lower()
     if suffix not in SUPPORTED_EXTENSIONS:
         raise HTTPException(status_code=400, detail=f"Unsupported file type: {suffix}")
 
-    stored_path = await storage_service.save_upload_file(file)
-    book_id = str(uuid.uuid4())
-
-    try:
-        structure = await run_in_threadpool(
-            ingestion_service.ingest,
-            stored_path,
-            book_id,
-            Path(file.filename).stem,
+    stored_path, content_hash = await storage_service.save_upload_file(file)
+
+    # Serialized per file across workers, so concurrent uploads of it share one job
+    async with async_file_lock("import", content_hash), get_async_session() as session:
+        job, existing, created = await session.run_sync(_register_upload, file.filename, stored_path, content_hash)
+    if existing:
+        response.status_code = 200
+        return serialize_job(job, existing)
+    if created:
+        ingestion_jobs.dispatch(job.id)
+    return serialize_job(job)
+
+
+def _register_upload(session: Session, filename: str, stored_path: Path, content_hash: str):
+    """Find or create the import job for an upload; returns ``(job, existing_book, created)``."""
+    existing = book_service.get_book_by_hash(session, content_hash)
+    if existing:
+        # Already imported: record a finished job pointing at the existing book
+        job = ingestion_jobs.create_job(
+            session,
+            filename=filename,
+            upload_path=stored_path,
+            title=Path(filename).stem,
+            content_hash=content_hash,
+            book_id=existing.id,
+            status="completed",
         )
-    except ValueError as exc:
-        raise HTTPException(status_code=400, detail=str(exc)) from exc
+        return job, existing, False
 
-    text_path = storage_service.save_text_json(book_id, structure)
+    job = ingestion_jobs.get_active_job(session, content_hash)
+    if job:
+        return job, None, False
 
-    with get_session() as session:
-        book = book_service.create_book(
-            session,
-            title=structure["title"],
-            filename=file.filename,
-            content_path=text_path,
-        )
+    job = ingestion_jobs.create_job(
+        session,
+        filename=filename,
+        upload_path=stored_path,
+        title=Path(filename).stem,
+        content_hash=content_hash,
+    )
+    return job, None, True
 
-    return BookDetailResponse(book=serialize_book(book), structure=BookStructure(**structure))
+
+@router.get("/books/import/{job_id}", response_model=ImportJobResponse)
+def read_import_job(job_id: str):
+    with get_session() as session:
+        job = ingestion_jobs.get_job(session, job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Import job not found")
+        book = book_service.get_book(session, job.book_id) if job.status == "completed" else None
+    return serialize_job(job, book)
 
 
 @router.get("/books", response_model=BookListResponse)
-def list_books():
+def list_books(
+    limit: int = Query(settings.books_page_size, ge=1, le=settings.books_page_max),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+):
     with get_session() as session:
-        books = book_service.list_books(session)
-    items = [serialize_book(book) for book in books]
-    return BookListResponse(items=items)
+        try:
+            rows, next_cursor = book_service.list_books_page(session, limit=limit, cursor=cursor)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        total = book_service.count_books(session) if include_total else None
+    items = [serialize_book(row) for row in rows]
+    return BookListResponse(items=items, next_cursor=next_cursor, total=total)
 
 
 @router.get("/books/{book_id}", response_model=BookDetailResponse)
-def get_book(book_id: str):
+def get_book(book_id: str, request: Request):
     with get_session() as session:
         book = book_service.get_book(session, book_id)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
-    structure = storage_service.load_text_json(book_id)
-    return BookDetailResponse(book=serialize_book(book), structure=BookStructure(**structure))
+    metadata = serialize_book(book)
+    try:
+        toc = storage_service.load_toc(book_id)
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail="Book content not found") from exc
+    etag = make_etag("book", toc["content_hash"], metadata.json())
 
+    # The stored structure was validated at ingestion, so it is encoded as-is
+    # (once per ETag) instead of being rebuilt as BookStructure models
+    def build():
+        return {"book": jsonable_encoder(metadata), "structure": storage_service.load_text_json(book_id)}
 
-@router.post("/books/{book_id}/progress", response_model=ProgressUpdate)
-def update_progress(book_id: str, payload: ProgressUpdate):
+    return cached_json_response(request, ("book", book_id), etag, build)
+
+
+@router.get("/books/{book_id}/toc", response_model=BookTOCResponse)
+def get_book_toc(book_id: str, response: Response, if_none_match: Optional[str] = Header(None)):
     with get_session() as session:
         book = book_service.get_book(session, book_id)
-        if not book:
-            raise HTTPException(status_code=404, detail="Book not found")
-        progress = book_service.upsert_progress(
-            session,
-            book_id,
-            chapter_id=payload.chapter_id,
-            paragraph_index=payload.paragraph_index,
-        )
-    return ProgressUpdate(chapter_id=progress.chapter_id, paragraph_index=progress.paragraph_index)
+    if not book:
+        raise HTTPException(status_code=404, detail="Book not found")
+    metadata = serialize_book(book)
+    try:
+        toc = storage_service.load_toc(book_id)
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail="Book content not found") from exc
+    etag = make_etag("toc", toc["content_hash"], metadata.json())
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    set_etag(response, etag)
+    return BookTOCResponse(book=metadata, toc=TableOfContents(**toc))
+
+
+@router.get("/books/{book_id}/chapters/{chapter_id}", response_model=ChapterResponse)
+def get_chapter(
+    book_id: str,
+    chapter_id: str,
+    response: Response,
+    start: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    if_none_match: Optional[str] = Header(None),
+):
+    with get_session() as session:
+        book = book_service.get_book(session, book_id)
+    if not book:
+        raise HTTPException(status_code=404, detail="Book not found")
+    try:
+        toc = storage_service.load_toc(book_id)
+        etag = make_etag("chapter", toc["content_hash"], chapter_id, str(start), str(limit))
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        stop = start + limit if limit is not None else None
+        chapter = storage_service.load_chapter(book_id, chapter_id, start, stop)
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=404, detail="Book content not found") from exc
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail="Chapter not found") from exc
+    set_etag(response, etag)
+    return ChapterResponse(book_id=book_id, chapter=Chapter(**chapter), start=start)
+
+
+@router.post("/books/{book_id}/progress", response_model=ProgressUpdate)
+async def update_progress(book_id: str, payload: ProgressUpdate):
+    async with get_async_session() as session:
+        book = await session.run_sync(book_service.get_book, book_id)
+    if not book:
+        raise HTTPException(status_code=404, detail="Book not found")
+    # Buffered; written to the database in batches by progress_buffer
+    progress_buffer.record(book_id, payload.chapter_id, payload.paragraph_index)
+    # Looks up the upcoming paragraphs on disk (and may migrate a legacy book)
+    await run_in_threadpool(tts_prefetcher.schedule, book_id, payload.chapter_id, payload.paragraph_index)
+    return ProgressUpdate(chapter_id=payload.chapter_id, paragraph_index=payload.paragraph_index)
 
 
 @router.get("/books/{book_id}/progress", response_model=ProgressUpdate)
-def read_progress(book_id: str):
-    with get_session() as session:
-        book = book_service.get_book(session, book_id)
+async def read_progress(book_id: str):
+    async with get_async_session() as session:
+        book = await session.run_sync(book_service.get_book, book_id)
         if not book:
             raise HTTPException(status_code=404, detail="Book not found")
-        progress = book_service.get_progress(session, book_id)
+        buffered = progress_buffer.get(book_id)
+        if buffered is not None:
+            chapter_id, paragraph_index = buffered
+            return ProgressUpdate(chapter_id=chapter_id, paragraph_index=paragraph_index)
+        progress = await session.run_sync(book_service.get_progress, book_id)
     if not progress:
         return ProgressUpdate(chapter_id=None, paragraph_index=None)
     return ProgressUpdate(chapter_id=progress.chapter_id, paragraph_index=progress.paragraph_index)
@@ -0,0 +1,42 @@
+from fastapi import APIRouter, HTTPException, Query
+
+from ...database import get_session
+from ...schemas import SearchHit, SearchResponse
+from ...services.books import book_service
+from ...services.jobs import ingestion_jobs
+from ...services.search import search_service
+
+router = APIRouter()
+
+
+@router.get("/books/{book_id}/search", response_model=SearchResponse)
+def search_book(
+    book_id: str,
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+):
+    with get_session() as session:
+        book = book_service.get_book(session, book_id)
+        if not book:
+            raise HTTPException(status_code=404, detail="Book not found")
+        # Imported before search existed, or indexing failed during import. A
+        # running import commits the book before indexing it; leave that to the job
+        if book.indexed_at is None and not ingestion_jobs.is_ingesting(session, book_id):
+            try:
+                search_service.index_book(session, book_id)
+            except FileNotFoundError as exc:
+                raise HTTPException(status_code=404, detail="Book content not found") from exc
+        hits = search_service.search(session, q, book_id=book_id, limit=limit, offset=offset)
+    return SearchResponse(query=q, items=[SearchHit(**hit) for hit in hits])
+
+
+@router.get("/search", response_model=SearchResponse)
+def search_library(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+):
+    with get_session() as session:
+        hits = search_service.search(session, q, limit=limit, offset=offset)
+    return SearchResponse(query=q, items=[SearchHit(**hit) for hit in hits])
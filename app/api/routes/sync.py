@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Query
+
+from ...config import settings
+from ...database import get_async_session
+from ...schemas import AnnotationResponse, SyncDeletion, SyncProgress, SyncResponse
+from ...services.progress import progress_buffer
+from ...services.sync import sync_service
+from ..utils import serialize_book
+
+router = APIRouter()
+
+
+@router.get("/sync", response_model=SyncResponse)
+async def sync_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(settings.sync_page_size, ge=1, le=settings.sync_page_max),
+):
+    # Buffered reading positions get their sequence numbers when written
+    await progress_buffer.flush()
+    async with get_async_session() as session:
+        reset = since > await session.run_sync(sync_service.current_seq)
+        changes = await session.run_sync(sync_service.changes, 0 if reset else since, limit)
+    return SyncResponse(
+        books=[serialize_book(book) for book in changes["books"]],
+        annotations=[
+            AnnotationResponse(
+                id=a.id,
+                book_id=a.book_id,
+                location=a.location,
+                note=a.note,
+                created_at=a.created_at,
+            )
+            for a in changes["annotations"]
+        ],
+        progress=[
+            SyncProgress(
+                book_id=p.book_id,
+                chapter_id=p.chapter_id,
+                paragraph_index=p.paragraph_index,
+                updated_at=p.updated_at,
+            )
+            for p in changes["progress"]
+        ],
+        deleted=[SyncDeletion(entity=t.entity, id=t.entity_id, book_id=t.book_id) for t in changes["deleted"]],
+        next_cursor=changes["next_cursor"],
+        has_more=changes["has_more"],
+        reset=reset,
+    )
@@ -1,16 +1,32 @@
+import httpx
 from fastapi import APIRouter, HTTPException
-from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 
 from ...schemas import TTSRequest, TTSResponse
-from ...services.tts import tts_service
+from ...services.tts import TTSOverloadedError, tts_service
 
 router = APIRouter()
 
 
 @router.post("/tts", response_model=TTSResponse)
 async def synthesize_tts(payload: TTSRequest):
+    if payload.stream:
+        if tts_service.is_overloaded():
+            raise HTTPException(
+                status_code=503, detail="TTS service is overloaded, try again shortly", headers={"Retry-After": "5"}
+            )
+        try:
+            audio = tts_service.stream(payload.text)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
+        return StreamingResponse(audio, media_type="audio/wav")
+
     try:
-        audio_path = await run_in_threadpool(tts_service.synthesize, payload.text)
+        audio_path = await tts_service.synthesize(payload.text)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except TTSOverloadedError as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "5"}) from exc
+    except httpx.HTTPError as exc:
+        raise HTTPException(status_code=502, detail=f"TTS service error: {exc}") from exc
     return TTSResponse(audio_path=audio_path)
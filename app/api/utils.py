@@ -1,7 +1,34 @@
+import gzip
+import hashlib
+import mimetypes
+import re
+from email.utils import formatdate, parsedate_to_datetime
 from pathlib import Path
+from typing import Any, Callable, Hashable, Iterator, Optional, Tuple
 
-from ..schemas import BookMetadata
-from ..models import Book
+import orjson
+from fastapi import Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip is offered
+    brotli = None
+
+from ..config import settings
+from ..schemas import BookMetadata, ImportJobResponse
+from ..models import Book, IngestionJob
+from ..services.cache import LRUCache
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+FILE_CHUNK_SIZE = 64 * 1024
+# Synthesized audio is content-addressed, so a URL's bytes never change
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+MEDIA_TYPES = {".wav": "audio/wav", ".mp3": "audio/mpeg"}
+
+encoded_responses = LRUCache(
+    settings.response_cache_max_entries, settings.response_cache_max_bytes, name="encoded_response"
+)
 
 
 def serialize_book(book: Book) -> BookMetadata:
@@ -12,3 +39,216 @@ def serialize_book(book: Book) -> BookMetadata:
         created_at=book.created_at,
         content_path=Path(book.content_path),
     )
+
+
+def serialize_job(job: IngestionJob, book: Optional[Book] = None) -> ImportJobResponse:
+    return ImportJobResponse(
+        job_id=job.id,
+        status=job.status,
+        filename=job.filename,
+        book_id=job.book_id,
+        error=job.error,
+        created_at=job.created_at,
+        updated_at=job.updated_at,
+        book=serialize_book(book) if book else None,
+    )
+
+
+def make_etag(*parts: str) -> str:
+    """Strong ETag derived from every input that affects the response body."""
+    digest = hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    # Clients may keep the body but must revalidate before reusing it
+    response.headers["Cache-Control"] = "no-cache"
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> str:
+    """Pick ``br``, ``gzip`` or ``identity`` from an Accept-Encoding header (q=0 excludes)."""
+    accepted = {}
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    offered = ("br", "gzip") if brotli is not None else ("gzip",)
+    best = max(offered, key=lambda name: accepted.get(name, accepted.get("*", 0.0)))
+    return best if accepted.get(best, accepted.get("*", 0.0)) > 0 else "identity"
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.response_brotli_quality)
+    return gzip.compress(body, compresslevel=settings.response_gzip_level)
+
+
+def cached_json_response(request: Request, key: Hashable, etag: str, build: Callable[[], Any]) -> Response:
+    """
+    Serve JSON that is fully determined by ``etag``: ``build()`` runs (and
+    orjson encodes it) once per ETag, compressed variants are made once per
+    encoding, and later requests are answered from bytes. ``build`` must
+    return already-validated, JSON-compatible data; no response model is
+    applied to it.
+    """
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    variants = {name: etag if name == "identity" else f'{etag[:-1]}-{name}"' for name in ("identity", "gzip", "br")}
+    if_none_match = request.headers.get("if-none-match")
+    if any(etag_matches(if_none_match, variant) for variant in variants.values()):
+        response = not_modified(variants[encoding])
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+    body = encoded_responses.get((key, "identity"), etag)
+    if body is None:
+        body = orjson.dumps(build())
+        encoded_responses.put((key, "identity"), etag, body, len(body))
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding != "identity" and len(body) >= settings.response_compress_min_bytes:
+        compressed = encoded_responses.get((key, encoding), etag)
+        if compressed is None:
+            compressed = _compress(body, encoding)
+            encoded_responses.put((key, encoding), etag, compressed, len(compressed))
+        body = compressed
+        headers["Content-Encoding"] = encoding
+    else:
+        encoding = "identity"
+    response = Response(content=body, media_type="application/json", headers=headers)
+    set_etag(response, variants[encoding])
+    return response
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single ``bytes=`` range into inclusive ``(start, end)`` offsets.
+    Returns None if the header should be ignored (multiple ranges or bad
+    syntax); raises ValueError if the range cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:  # suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or (last and int(last) < start):
+        raise ValueError("Unsatisfiable range")
+    return start, end
+
+
+def _iter_file(path: Path, start: int, length: int) -> Iterator[bytes]:
+    with path.open("rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(FILE_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _not_modified_since(if_modified_since: str, mtime: float) -> bool:
+    try:
+        return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
+def _last_modified_matches(if_range: str, mtime: float) -> bool:
+    # If-Range dates are exact-match validators (RFC 9110 13.1.5), unlike If-Modified-Since
+    try:
+        return int(mtime) == int(parsedate_to_datetime(if_range).timestamp())
+    except (TypeError, ValueError):
+        return False
+
+
+def file_response(
+    request: Request,
+    path: Path,
+    *,
+    media_type: Optional[str] = None,
+    cache_control: str = IMMUTABLE_CACHE_CONTROL,
+) -> Response:
+    """
+    Serve a file with validators and byte ranges: ETag/Last-Modified,
+    If-None-Match/If-Modified-Since (304), Range (206, single range) and
+    If-Range, so seeking in long audio only transfers the bytes needed.
+    """
+    stat = path.stat()
+    size = stat.st_size
+    etag = make_etag("file", path.name, str(size), str(stat.st_mtime_ns))
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+    }
+    media_type = (
+        media_type
+        or MEDIA_TYPES.get(path.suffix.lower())
+        or mimetypes.guess_type(path.name)[0]
+        or "application/octet-stream"
+    )
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+    elif request.headers.get("if-modified-since") and _not_modified_since(
+        request.headers["if-modified-since"], stat.st_mtime
+    ):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and if_range:
+        # Only honour the range if the client's copy is still current
+        if if_range.startswith(('"', "W/")):
+            valid = if_range.strip() == etag
+        else:
+            valid = _last_modified_matches(if_range, stat.st_mtime)
+        if not valid:
+            range_header = None
+
+    if range_header:
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status_code=416, headers=headers)
+        if byte_range is not None:
+            start, end = byte_range
+            length = end - start + 1
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            headers["Content-Length"] = str(length)
+            return StreamingResponse(
+                _iter_file(path, start, length), status_code=206, media_type=media_type, headers=headers
+            )
+
+    return FileResponse(path, media_type=media_type, headers=headers, stat_result=stat)
@@ -1,4 +1,6 @@
 from pathlib import Path
+from typing import Optional
+
 from pydantic import BaseSettings
 
 
@@ -9,6 +11,42 @@ class Settings(BaseSettings):
 
     # Database settings (SQLite by default)
     db_url: str = "sqlite:///./readme.db"
+    db_async_url: Optional[str] = None  # defaults to db_url with the aiosqlite driver
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    # SQLite connection pragmas: WAL lets readers run alongside the single writer
+    db_journal_mode: str = "WAL"
+    db_busy_timeout_ms: int = 5000
+    db_synchronous: str = "NORMAL"  # safe with WAL; FULL fsyncs every commit
+    db_cache_size_kib: int = 16 * 1024
+
+    # Background ingestion: parsing runs in a dedicated process pool
+    ingestion_workers: int = 2
+
+    # Streaming ingestion: peak memory is bounded by these, not by document size
+    ingestion_read_chunk_bytes: int = 1024 * 1024
+    ingestion_max_paragraph_chars: int = 64 * 1024
+    ingestion_chapter_size: int = 40  # paragraphs per generated chapter
+
+    # Parallel extraction: PDF page ranges and EPUB spine documents are
+    # extracted in worker processes
+    extract_workers: int = 0  # total across ingestion_workers; 0 = one per CPU core
+    pdf_pages_per_range: int = 32
+    pdf_parallel_min_pages: int = 64  # smaller PDFs are extracted in-process
+    epub_documents_per_task: int = 8
+    epub_parallel_min_documents: int = 32  # smaller EPUBs are extracted in-process
+
+    # Library listing (keyset-paginated)
+    books_page_size: int = 50
+    books_page_max: int = 500
+
+    # GET /sync: changes returned per request
+    sync_page_size: int = 1000
+    sync_page_max: int = 10000
+
+    # Reading progress is buffered in memory and written in batches
+    progress_flush_interval: float = 2.0  # seconds
 
     # Storage directories
     storage_root: Path = Path("/var/readme_storage")
@@ -16,9 +54,60 @@ class Settings(BaseSettings):
     audio_path: Path = storage_root / "audio"
     cache_path: Path = storage_root / "cache"
 
+    # Disk quotas per storage area in bytes (0 = unlimited); least recently
+    # used files are evicted by a background sweep
+    storage_quota_tts_bytes: int = 10 * 1024 ** 3
+    storage_quota_audio_bytes: int = 10 * 1024 ** 3
+    storage_quota_uploads_bytes: int = 5 * 1024 ** 3
+    storage_quota_books_bytes: int = 0  # only directories of deleted/failed books are ever evicted
+    storage_sweep_interval: float = 300.0  # seconds
+    storage_min_idle_seconds: float = 600.0  # files used more recently are never evicted
+
+    # In-process caches of parsed book data (validated against file mtime)
+    book_cache_max_entries: int = 32
+    book_cache_max_bytes: int = 256 * 1024 * 1024
+    toc_cache_max_entries: int = 1024
+
+    # Large JSON responses (full book structure) are serialized once per ETag
+    # and encoding, then served as bytes; gzip/brotli are negotiated per request
+    response_cache_max_entries: int = 256
+    response_cache_max_bytes: int = 128 * 1024 * 1024
+    response_compress_min_bytes: int = 1024
+    response_gzip_level: int = 6
+    response_brotli_quality: int = 5  # brotli is used only when the package is installed
+
     # TTS output directory (Coqui XTTS writes WAV files here)
     tts_output_path: Path = storage_root / "tts_output"
 
+    # Coqui TTS service (voice/model settings are part of the synthesis cache key)
+    tts_api_url: str = "http://tts:5002/api/tts"
+    tts_model_name: str = "tts_models/multilingual/multi-dataset/xtts_v2"
+    tts_speaker_id: Optional[str] = None
+    tts_language_id: Optional[str] = None
+
+    # Coqui HTTP client: one pooled client per process, bounded in-flight work
+    tts_timeout: float = 120.0
+    tts_max_connections: int = 4
+    tts_max_concurrency: int = 2  # requests in flight against Coqui at once
+    tts_foreground_reserved_slots: int = 1  # of those, never taken by prefetch/chapter builds
+    tts_max_queue_depth: int = 32  # requests waiting for a slot before we answer 503
+    tts_max_retries: int = 2
+    tts_retry_backoff: float = 0.5  # seconds, doubled on each retry
+
+    # Background TTS prefetch driven by reading progress
+    tts_prefetch_enabled: bool = True
+    tts_prefetch_lookahead: int = 3  # paragraphs past the current position
+    tts_prefetch_concurrency: int = 2  # worker tasks synthesizing in the background
+    tts_prefetch_queue_size: int = 64
+    tts_prefetch_cancel_on_jump: bool = True
+
+    # Streaming /api/tts: text is split into sentence chunks synthesized concurrently
+    tts_stream_concurrency: int = 3
+    tts_stream_max_chunk_chars: int = 400
+
+    # Chapter audiobook builds: paragraphs synthesized at once per build
+    chapter_audio_concurrency: int = 2
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -27,12 +116,14 @@ class Settings(BaseSettings):
 # Create global settings instance
 settings = Settings()
 
-# Ensure directories exist
-for path in [
-    settings.storage_root,
-    settings.books_path,
-    settings.audio_path,
-    settings.cache_path,
-    settings.tts_output_path,
-]:
-    path.mkdir(parents=True, exist_ok=True)
+
+def ensure_directories() -> None:
+    """Create the storage directories; called from the app lifespan, not at import."""
+    for path in [
+        settings.storage_root,
+        settings.books_path,
+        settings.audio_path,
+        settings.cache_path,
+        settings.tts_output_path,
+    ]:
+        path.mkdir(parents=True, exist_ok=True)
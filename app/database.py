@@ -1,25 +1,109 @@
-from contextlib import contextmanager
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.schema import CreateColumn
 
 from .config import settings
+from .services.metrics import DB_SESSION_SECONDS
 
-DATABASE_URL = f"sqlite:///{settings.db_path}"
+DATABASE_URL = settings.db_url
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    future=True,
-)
+
+def _async_url(url: str) -> str:
+    parsed = make_url(url)
+    if parsed.drivername == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    return parsed.render_as_string(hide_password=False)
+
+
+ASYNC_DATABASE_URL = settings.db_async_url or _async_url(DATABASE_URL)
+
+
+def _engine_options(url: str) -> Dict[str, Any]:
+    parsed = make_url(url)
+    options: Dict[str, Any] = {}
+    if parsed.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if parsed.database in (None, "", ":memory:"):
+            return options  # in-memory databases use a single shared connection
+    options.update(
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+    )
+    return options
+
+
+def _apply_sqlite_pragmas(engine: Engine) -> None:
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"PRAGMA journal_mode={settings.db_journal_mode}")
+            cursor.execute(f"PRAGMA busy_timeout={int(settings.db_busy_timeout_ms)}")
+            cursor.execute(f"PRAGMA synchronous={settings.db_synchronous}")
+            cursor.execute(f"PRAGMA cache_size=-{int(settings.db_cache_size_kib)}")
+        finally:
+            cursor.close()
+
+
+engine = create_engine(DATABASE_URL, future=True, **_engine_options(DATABASE_URL))
+_apply_sqlite_pragmas(engine)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+
+# Async sessions for request handlers, so commits don't block the event loop
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_engine_options(ASYNC_DATABASE_URL))
+_apply_sqlite_pragmas(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 
 @contextmanager
 def get_session() -> Session:
+    started = time.perf_counter()
     session = SessionLocal()
     try:
         yield session
     finally:
         session.close()
+        DB_SESSION_SECONDS.observe(time.perf_counter() - started, "sync")
+
+
+@asynccontextmanager
+async def get_async_session() -> AsyncIterator[AsyncSession]:
+    started = time.perf_counter()
+    session = AsyncSessionLocal()
+    try:
+        yield session
+    finally:
+        await session.close()
+        DB_SESSION_SECONDS.observe(time.perf_counter() - started, "async")
+
+
+def migrate_schema() -> None:
+    """
+    Bring existing tables up to date with the models. ``create_all`` only
+    creates missing tables, so columns and indexes added to a model later
+    are added here (new columns must be nullable or have a server default).
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
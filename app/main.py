@@ -1,14 +1,53 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 
-from .config import settings
-from .database import Base, engine
-from .api.routes import books, tts, annotations, audio
+from .config import ensure_directories, settings
+from .database import Base, engine, migrate_schema
+from .api.middleware import MetricsMiddleware
+from .api.routes import books, tts, annotations, audio, metrics, search, sync
+from .services.audiobook import chapter_audio_service
+from .services.jobs import ingestion_jobs
+from .services.prefetch import tts_prefetcher
+from .services.progress import progress_buffer
+from .services.search import search_service
+from .services.storage_manager import storage_manager
+from .services.sync import sync_service
+from .services.tts import tts_service
 
 
-def create_app() -> FastAPI:
+def init_storage() -> None:
+    """Create storage directories and bring the database schema up to date."""
+    ensure_directories()
     Base.metadata.create_all(bind=engine)
-    app = FastAPI(title=settings.app_name)
+    migrate_schema()
+    with engine.begin() as conn:
+        search_service.create_index(conn)
+        sync_service.create_triggers(conn)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Done at startup rather than import, so importing the app stays cheap
+    await run_in_threadpool(init_storage)
+    await tts_service.start()
+    await tts_prefetcher.start()
+    await progress_buffer.start()
+    await ingestion_jobs.start()
+    await storage_manager.start()
+    yield
+    await ingestion_jobs.stop()
+    await chapter_audio_service.stop()
+    await storage_manager.stop()
+    await progress_buffer.stop()
+    await tts_prefetcher.stop()
+    await tts_service.close()
+
+
+def create_app() -> FastAPI:
+    app = FastAPI(title=settings.app_name, lifespan=lifespan)
 
     app.add_middleware(
         CORSMiddleware,
@@ -17,11 +56,15 @@ def create_app() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    app.add_middleware(MetricsMiddleware)
 
     app.include_router(books.router, prefix=settings.api_prefix, tags=["books"])
     app.include_router(tts.router, prefix=settings.api_prefix, tags=["tts"])
     app.include_router(audio.router, prefix=settings.api_prefix, tags=["audio"])
     app.include_router(annotations.router, prefix=settings.api_prefix, tags=["annotations"])
+    app.include_router(search.router, prefix=settings.api_prefix, tags=["search"])
+    app.include_router(sync.router, prefix=settings.api_prefix, tags=["sync"])
+    app.include_router(metrics.router, tags=["metrics"])
 
     @app.get("/")
     def read_root():
@@ -5,6 +5,7 @@ from sqlalchemy import (
     Column,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
@@ -27,7 +28,10 @@ class Book(Base):
     filename = Column(String, nullable=False)
     content_path = Column(String, nullable=False)
     cover_path = Column(String, nullable=True)
+    content_hash = Column(String, nullable=True, index=True)  # sha256 of the uploaded file
+    indexed_at = Column(DateTime, nullable=True)  # last full-text indexing, None if never
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    change_seq = Column(Integer, nullable=True, index=True)  # set by database triggers, see SyncService
 
     # FIXED: SQLAlchemy reserves "metadata"
     extra_metadata = Column(Text, nullable=True)
@@ -45,6 +49,9 @@ class Book(Base):
         cascade="all, delete-orphan"
     )
 
+    # Library listing pages through books newest first on this key
+    __table_args__ = (Index("ix_books_created_at_id", "created_at", "id"),)
+
 
 class Annotation(Base):
     __tablename__ = "annotations"
@@ -54,6 +61,7 @@ class Annotation(Base):
     location = Column(String, nullable=False)
     note = Column(Text, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    change_seq = Column(Integer, nullable=True, index=True)
 
     book = relationship("Book", back_populates="annotations")
 
@@ -67,5 +75,57 @@ class Progress(Base):
     paragraph_index = Column(Integer, nullable=True)
     updated_at = Column(DateTime, default=datetime.utcnow,
                         nullable=False, onupdate=datetime.utcnow)
+    change_seq = Column(Integer, nullable=True, index=True)
 
     book = relationship("Book", back_populates="progress")
+
+
+class SyncCounter(Base):
+    """Single row holding the last change sequence number handed out."""
+
+    __tablename__ = "sync_counter"
+
+    id = Column(Integer, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+
+class SyncTombstone(Base):
+    """A deleted book, annotation or progress row, kept so clients can sync the deletion."""
+
+    __tablename__ = "sync_tombstones"
+
+    change_seq = Column(Integer, primary_key=True, autoincrement=False)
+    entity = Column(String, nullable=False)  # book, annotation or progress
+    entity_id = Column(String, nullable=False)
+    book_id = Column(String, nullable=False)
+    deleted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class StoredFile(Base):
+    """Size and last access of a managed file (or book directory), for quota eviction."""
+
+    __tablename__ = "stored_files"
+
+    path = Column(String, primary_key=True)
+    area = Column(String, nullable=False)  # tts, audio, uploads or books
+    size = Column(Integer, nullable=False, default=0)
+    last_access = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (Index("ix_stored_files_area_last_access", "area", "last_access"),)
+
+
+class IngestionJob(Base):
+    __tablename__ = "ingestion_jobs"
+
+    id = Column(String, primary_key=True, default=generate_uuid)
+    book_id = Column(String, nullable=False, default=generate_uuid)
+    filename = Column(String, nullable=False)
+    upload_path = Column(String, nullable=False)
+    content_hash = Column(String, nullable=True, index=True)
+    title = Column(String, nullable=True)
+    # queued -> running -> completed | failed
+    status = Column(String, nullable=False, default="queued", index=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow,
+                        nullable=False, onupdate=datetime.utcnow)
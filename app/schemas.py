@@ -30,6 +30,8 @@ class BookMetadata(BaseModel):
 
 class BookListResponse(BaseModel):
     items: List[BookMetadata]
+    next_cursor: Optional[str] = None  # pass as ?cursor= for the next page; None on the last page
+    total: Optional[int] = None  # only with ?include_total=true
 
 
 class BookDetailResponse(BaseModel):
@@ -40,14 +42,75 @@ class BookDetailResponse(BaseModel):
 BookImportResponse = BookDetailResponse
 
 
+class ImportJobResponse(BaseModel):
+    job_id: str
+    status: str
+    filename: str
+    book_id: str
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    book: Optional[BookMetadata] = None
+
+
+class ChapterSummary(BaseModel):
+    chapter_id: str
+    title: str
+    paragraph_count: int
+
+
+class TableOfContents(BaseModel):
+    book_id: str
+    title: str
+    chapters: List[ChapterSummary]
+
+
+class BookTOCResponse(BaseModel):
+    book: BookMetadata
+    toc: TableOfContents
+
+
+class ChapterResponse(BaseModel):
+    book_id: str
+    chapter: Chapter
+    start: int = 0  # index of chapter.paragraphs[0] within the chapter
+
+
 class TTSRequest(BaseModel):
     text: str
+    stream: bool = False
 
 
 class TTSResponse(BaseModel):
     audio_path: Path
 
 
+class ChapterAudioParagraph(BaseModel):
+    paragraph_index: int
+    byte_offset: int  # from the start of the WAV file, usable in a Range header
+    byte_length: int
+    start: float  # seconds
+    duration: float
+
+
+class ChapterAudioIndex(BaseModel):
+    channels: int
+    sample_width: int
+    frame_rate: int
+    data_offset: int
+    duration: float
+    size: int
+    paragraphs: List[ChapterAudioParagraph]
+
+
+class ChapterAudioStatus(BaseModel):
+    book_id: str
+    chapter_id: str
+    status: str  # missing, building, ready or failed
+    error: Optional[str] = None
+    index: Optional[ChapterAudioIndex] = None
+
+
 class AnnotationRequest(BaseModel):
     book_id: str
     location: str
@@ -66,6 +129,43 @@ class AnnotationListResponse(BaseModel):
     items: List[AnnotationResponse]
 
 
+class SearchHit(BaseModel):
+    book_id: str
+    book_title: str
+    chapter_id: str
+    paragraph_index: int
+    snippet: str
+    rank: float
+
+
+class SearchResponse(BaseModel):
+    query: str
+    items: List[SearchHit]
+
+
 class ProgressUpdate(BaseModel):
     chapter_id: Optional[str] = None
     paragraph_index: Optional[int] = None
+
+
+class SyncProgress(BaseModel):
+    book_id: str
+    chapter_id: Optional[str] = None
+    paragraph_index: Optional[int] = None
+    updated_at: datetime
+
+
+class SyncDeletion(BaseModel):
+    entity: str  # book, annotation or progress
+    id: str  # book id for progress
+    book_id: str
+
+
+class SyncResponse(BaseModel):
+    books: List[BookMetadata]
+    annotations: List[AnnotationResponse]
+    progress: List[SyncProgress]
+    deleted: List[SyncDeletion]
+    next_cursor: int
+    has_more: bool
+    reset: bool = False  # the cursor is from another database: drop local state and apply this as a full sync
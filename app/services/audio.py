@@ -0,0 +1,43 @@
+import struct
+import wave
+from pathlib import Path
+from typing import NamedTuple, Tuple
+
+# RIFF/data sizes used when the total length is unknown up front (streamed output)
+STREAMING_SIZE = 0xFFFFFFFF
+
+
+class PCMFormat(NamedTuple):
+    channels: int
+    sample_width: int
+    frame_rate: int
+
+
+def read_wav(path: Path) -> Tuple[PCMFormat, bytes]:
+    """Return the PCM format and raw frame bytes of a WAV file, without decoding samples."""
+    with wave.open(str(path), "rb") as wav:
+        fmt = PCMFormat(wav.getnchannels(), wav.getsampwidth(), wav.getframerate())
+        frames = wav.readframes(wav.getnframes())
+    return fmt, frames
+
+
+def wav_header(fmt: PCMFormat, data_size: int = STREAMING_SIZE) -> bytes:
+    """Build a canonical 44-byte PCM WAV header for ``data_size`` bytes of frames."""
+    block_align = fmt.channels * fmt.sample_width
+    riff_size = STREAMING_SIZE if data_size == STREAMING_SIZE else 36 + data_size
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF",
+        riff_size,
+        b"WAVE",
+        b"fmt ",
+        16,
+        1,  # PCM
+        fmt.channels,
+        fmt.frame_rate,
+        fmt.frame_rate * block_align,
+        block_align,
+        fmt.sample_width * 8,
+        b"data",
+        data_size,
+    )
@@ -0,0 +1,187 @@
+import asyncio
+import hashlib
+import json
+import logging
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..config import settings
+from .audio import read_wav, wav_header
+from .cache import normalize_text
+from .storage import storage_service
+from .storage_manager import storage_manager
+from .tts import tts_service
+
+logger = logging.getLogger(__name__)
+
+HEADER_SIZE = 44  # canonical PCM header written by wav_header
+
+
+class ChapterAudioService:
+    """
+    Builds one WAV per chapter by concatenating the (cached) per-paragraph
+    synthesis output, plus a JSON sidecar mapping each paragraph to its byte
+    and time offset in that file. Frames are copied as-is, never re-decoded.
+
+    Files live under ``audio_path/<book_id>/`` and are rebuilt when the book
+    content or the voice settings change.
+    """
+
+    def __init__(self) -> None:
+        self.base_dir = Path(settings.audio_path)
+        self._builds: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._errors: Dict[Tuple[str, str], str] = {}
+
+    def paths(self, book_id: str, chapter_id: str) -> Tuple[Path, Path]:
+        """``(wav, index)`` paths; raises KeyError for an unknown chapter."""
+        position = self._chapter_position(book_id, chapter_id)
+        stem = self.base_dir / book_id / f"chapter-{position}"
+        return stem.with_suffix(".wav"), stem.with_suffix(".json")
+
+    def load_index(self, book_id: str, chapter_id: str) -> Optional[Dict[str, Any]]:
+        """The sidecar index if the chapter audio is built and current, else None."""
+        audio_path, index_path = self.paths(book_id, chapter_id)
+        try:
+            index = json.loads(index_path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return None
+        if index.get("build_key") != self._build_key(book_id) or not audio_path.exists():
+            return None
+        return index
+
+    def status(self, book_id: str, chapter_id: str) -> Tuple[str, Optional[str]]:
+        """``(status, error)`` where status is ready, building, failed or missing."""
+        key = (book_id, chapter_id)
+        if key in self._builds:
+            return "building", None
+        if self.load_index(book_id, chapter_id) is not None:
+            return "ready", None
+        if key in self._errors:
+            return "failed", self._errors[key]
+        return "missing", None
+
+    def start_build(self, book_id: str, chapter_id: str) -> None:
+        """
+        Build in the background unless a build is already running. Must be
+        called on the event loop and does no disk I/O; callers check
+        ``status`` (off the loop) first so a current build isn't redone.
+        """
+        key = (book_id, chapter_id)
+        if key in self._builds:
+            return
+        self._errors.pop(key, None)
+        task = asyncio.create_task(self._build_logged(book_id, chapter_id))
+        self._builds[key] = task
+        task.add_done_callback(lambda _: self._builds.pop(key, None))
+
+    async def stop(self) -> None:
+        builds = list(self._builds.values())
+        for task in builds:
+            task.cancel()
+        await asyncio.gather(*builds, return_exceptions=True)
+
+    async def build(self, book_id: str, chapter_id: str) -> Dict[str, Any]:
+        """Synthesize (or take from cache) every paragraph and assemble the chapter; returns the index."""
+        chapter = await asyncio.to_thread(storage_service.load_chapter, book_id, chapter_id)
+        semaphore = asyncio.Semaphore(settings.chapter_audio_concurrency)
+
+        async def synthesize(text: str) -> Optional[str]:
+            if not normalize_text(text):
+                return None
+            async with semaphore:
+                return await tts_service.synthesize(text, background=True)
+
+        tasks = [asyncio.create_task(synthesize(text)) for text in chapter["paragraphs"]]
+        try:
+            sources = [await task for task in tasks]
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        return await asyncio.to_thread(self._write, book_id, chapter_id, sources)
+
+    def _write(self, book_id: str, chapter_id: str, sources: List[Optional[str]]) -> Dict[str, Any]:
+        """Assemble the chapter WAV and write its index; all disk work, so run off the event loop."""
+        audio_path, index_path = self.paths(book_id, chapter_id)
+        index = self._assemble(sources, audio_path)
+        index.update(book_id=book_id, chapter_id=chapter_id, build_key=self._build_key(book_id))
+        tmp_index = index_path.with_name(f".{index_path.name}.{uuid.uuid4().hex}")
+        tmp_index.write_text(json.dumps(index), encoding="utf-8")
+        tmp_index.replace(index_path)
+        storage_manager.touch(audio_path)
+        return index
+
+    def _assemble(self, sources: List[Optional[str]], audio_path: Path) -> Dict[str, Any]:
+        """Concatenate PCM frames into ``audio_path`` and return the offset index."""
+        audio_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = audio_path.with_name(f".{audio_path.name}.{uuid.uuid4().hex}")
+        chapter_format = None
+        paragraphs: List[Dict[str, Any]] = []
+        data_size = 0
+        try:
+            with tmp_path.open("wb") as out:
+                out.write(b"\0" * HEADER_SIZE)  # rewritten once the data size is known
+                for paragraph_index, source in enumerate(sources):
+                    frames = b""
+                    if source is not None:
+                        fmt, frames = read_wav(Path(source))
+                        if chapter_format is None:
+                            chapter_format = fmt
+                        elif fmt != chapter_format:
+                            raise ValueError(f"TTS returned mixed audio formats: {chapter_format} vs {fmt}")
+                        out.write(frames)
+                    paragraphs.append(
+                        {
+                            "paragraph_index": paragraph_index,
+                            "byte_offset": HEADER_SIZE + data_size,
+                            "byte_length": len(frames),
+                        }
+                    )
+                    data_size += len(frames)
+                if chapter_format is None:
+                    raise ValueError("Chapter has no text to synthesize")
+                out.seek(0)
+                out.write(wav_header(chapter_format, data_size))
+            tmp_path.replace(audio_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+        bytes_per_second = chapter_format.frame_rate * chapter_format.channels * chapter_format.sample_width
+        for entry in paragraphs:
+            entry["start"] = (entry["byte_offset"] - HEADER_SIZE) / bytes_per_second
+            entry["duration"] = entry["byte_length"] / bytes_per_second
+        return {
+            "channels": chapter_format.channels,
+            "sample_width": chapter_format.sample_width,
+            "frame_rate": chapter_format.frame_rate,
+            "data_offset": HEADER_SIZE,
+            "duration": data_size / bytes_per_second,
+            "size": HEADER_SIZE + data_size,
+            "paragraphs": paragraphs,
+        }
+
+    async def _build_logged(self, book_id: str, chapter_id: str) -> None:
+        try:
+            await self.build(book_id, chapter_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.exception("Chapter audio build failed for %s/%s", book_id, chapter_id)
+            self._errors[(book_id, chapter_id)] = str(exc) or exc.__class__.__name__
+
+    def _chapter_position(self, book_id: str, chapter_id: str) -> int:
+        chapters = storage_service.load_toc(book_id)["chapters"]
+        for position, entry in enumerate(chapters):
+            if entry["chapter_id"] == chapter_id:
+                return position
+        raise KeyError(f"Chapter {chapter_id} not found in {book_id}")
+
+    def _build_key(self, book_id: str) -> str:
+        toc = storage_service.load_toc(book_id)
+        voice = json.dumps(tts_service.voice_settings(), sort_keys=True)
+        return hashlib.sha256(f"{toc['content_hash']}\x1f{voice}".encode("utf-8")).hexdigest()
+
+
+chapter_audio_service = ChapterAudioService()
@@ -1,14 +1,41 @@
+import base64
 import json
+import threading
+from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-from sqlalchemy import select
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
 
 from ..models import Annotation, Book, Progress
 
 
+# Columns needed for BookMetadata; the extra_metadata blob is never loaded for listings
+LISTING_COLUMNS = (Book.id, Book.title, Book.filename, Book.created_at, Book.content_path)
+
+
+def encode_cursor(created_at: datetime, book_id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), book_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Inverse of ``encode_cursor``; raises ValueError for a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, book_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(book_id)
+    except Exception as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
 class BookService:
+    def __init__(self) -> None:
+        self._count_lock = threading.Lock()
+        self._count_cache: Optional[Tuple[Any, int]] = None
+
     def create_book(
         self,
         session: Session,
@@ -17,12 +44,16 @@ class BookService:
         filename: str,
         content_path: Path,
         metadata: Optional[Dict[str, Any]] = None,
+        book_id: Optional[str] = None,
+        content_hash: Optional[str] = None,
     ) -> Book:
         book = Book(
+            id=book_id,
             title=title,
             filename=filename,
             content_path=str(content_path),
-            metadata=json.dumps(metadata or {}),
+            content_hash=content_hash,
+            extra_metadata=json.dumps(metadata or {}),
         )
         session.add(book)
         session.commit()
@@ -33,9 +64,53 @@ class BookService:
         result = session.execute(select(Book).order_by(Book.created_at.desc()))
         return result.scalars().all()
 
+    def list_books_page(
+        self, session: Session, *, limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[Row], Optional[str]]:
+        """
+        One page of the library, newest first, as rows of ``LISTING_COLUMNS``.
+        Seeks past ``cursor`` on the (created_at, id) index, so every page
+        costs the same however deep it is. Returns the rows and the next cursor.
+        """
+        query = select(*LISTING_COLUMNS).order_by(Book.created_at.desc(), Book.id.desc()).limit(limit + 1)
+        if cursor:
+            created_at, book_id = decode_cursor(cursor)
+            query = query.where(tuple_(Book.created_at, Book.id) < tuple_(created_at, book_id))
+        rows = session.execute(query).all()
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    def count_books(self, session: Session) -> int:
+        """
+        Total number of books. COUNT(*) scans the table, so the result is
+        cached until the newest (created_at, id), read from the index, changes.
+        """
+        newest = session.execute(
+            select(Book.created_at, Book.id).order_by(Book.created_at.desc(), Book.id.desc()).limit(1)
+        ).first()
+        validator = tuple(newest) if newest else None
+        with self._count_lock:
+            if self._count_cache is not None and self._count_cache[0] == validator:
+                return self._count_cache[1]
+        total = session.execute(select(func.count()).select_from(Book)).scalar_one()
+        with self._count_lock:
+            self._count_cache = (validator, total)
+        return total
+
+    def invalidate_count(self) -> None:
+        """Call after deleting books; inserts are picked up automatically."""
+        with self._count_lock:
+            self._count_cache = None
+
     def get_book(self, session: Session, book_id: str) -> Book | None:
         return session.get(Book, book_id)
 
+    def get_book_by_hash(self, session: Session, content_hash: str) -> Book | None:
+        result = session.execute(select(Book).where(Book.content_hash == content_hash).limit(1))
+        return result.scalar_one_or_none()
+
     def upsert_progress(
         self,
         session: Session,
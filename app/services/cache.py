@@ -0,0 +1,166 @@
+import hashlib
+import json
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from .metrics import CACHE_REQUESTS
+from .storage_manager import storage_manager
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace and unicode variants so equivalent text shares a cache key."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+class SynthesisCache:
+    """
+    Content-addressed index of synthesized WAV files.
+
+    Entries are appended to a JSON-lines file under ``settings.cache_path`` so
+    the index survives restarts and concurrent workers never rewrite each
+    other's entries.
+    """
+
+    def __init__(self, index_path: Path, audio_dir: Path) -> None:
+        self.index_path = index_path
+        self.audio_dir = audio_dir
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._loaded = False  # the index is read on first use, not at import
+
+    def key_for(self, text: str, voice: Dict[str, Optional[str]]) -> str:
+        payload = json.dumps(
+            {"text": normalize_text(text), "voice": voice},
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def audio_path(self, key: str) -> Path:
+        return self.audio_dir / f"tts_{key}.wav"
+
+    def get(self, key: str) -> Path | None:
+        self._ensure_loaded()
+        with self._lock:
+            entry = self._entries.get(key)
+        path = self.audio_dir / entry["file"] if entry else self.audio_path(key)
+        if path.exists():
+            if not entry:
+                # Written by another worker since we loaded the index
+                self.put(key, path)
+            CACHE_REQUESTS.inc("tts_synthesis", "hit")
+            storage_manager.touch(path)
+            return path
+        if entry:
+            with self._lock:
+                self._entries.pop(key, None)
+        CACHE_REQUESTS.inc("tts_synthesis", "miss")
+        return None
+
+    def put(self, key: str, path: Path, **extra: Any) -> None:
+        self._ensure_loaded()
+        entry = {"key": key, "file": path.name, "created_at": time.time(), **extra}
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._entries[key] = entry
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            with self.index_path.open("a", encoding="utf-8") as f:
+                f.write(line)
+        storage_manager.touch(path)
+
+    def compact(self) -> int:
+        """
+        Rewrite the index with only entries whose WAV still exists (after
+        eviction). A line appended by another worker meanwhile may be lost;
+        ``get`` finds such files by their key anyway. Returns entries kept.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            self._entries = {
+                key: entry for key, entry in self._entries.items() if (self.audio_dir / entry["file"]).exists()
+            }
+            tmp_path = self.index_path.with_name(f".{self.index_path.name}.tmp")
+            with tmp_path.open("w", encoding="utf-8") as f:
+                for entry in self._entries.values():
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            tmp_path.replace(self.index_path)
+            return len(self._entries)
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._load()
+                    self._loaded = True
+
+    def _load(self) -> None:
+        if not self.index_path.exists():
+            return
+        with self.index_path.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:  # torn write from a crash; skip it
+                    continue
+                self._entries[entry["key"]] = entry
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache bounded by entry count and an approximate byte size.
+
+    Every entry carries a validator (for example a file's mtime/size) and is
+    only returned while the caller's current validator still matches. Cached
+    values are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: Optional[int] = None, name: str = "lru") -> None:
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[Hashable, Any, int]]" = OrderedDict()
+        self._bytes = 0
+
+    def get(self, key: Hashable, validator: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != validator:
+                if entry is not None:
+                    self._drop(key)
+                CACHE_REQUESTS.inc(self.name, "miss")
+                return None
+            self._entries.move_to_end(key)
+        CACHE_REQUESTS.inc(self.name, "hit")
+        return entry[1]
+
+    def put(self, key: Hashable, validator: Hashable, value: Any, size: int = 0) -> None:
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (validator, value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _drop(self, key: Hashable) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
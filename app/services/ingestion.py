@@ -1,86 +1,453 @@
-import json
+import functools
+import multiprocessing
+import os
+import posixpath
 import re
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from pathlib import Path
-from typing import List
+from types import ModuleType
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+from urllib.parse import unquote
+from xml.etree import ElementTree
 
-import docx2txt
-import fitz
-import pdfplumber
-from ebooklib import epub
-from bs4 import BeautifulSoup
+# Parser libraries (PyMuPDF, pdfplumber, lxml, BeautifulSoup) are imported on
+# first use of their format, so processes that never ingest don't pay for them
+from ..config import settings
+from .metrics import INGESTION_BYTES, INGESTION_PARAGRAPHS, INGESTION_STAGE_SECONDS, timed_iter
+from .storage import storage_service
+
+CONTAINER_NS = "{urn:oasis:names:tc:opendocument:xmlns:container}"
+OPF_NS = "{http://www.idpf.org/2007/opf}"
+WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+HTML_MEDIA_TYPES = {"application/xhtml+xml", "text/html"}
+BLOCK_TAGS = (
+    "p", "h1", "h2", "h3", "h4", "h5", "h6", "li", "blockquote", "pre", "dt", "dd",
+    "td", "th", "caption", "figcaption", "div", "section", "article", "aside",
+)
+HEADING_TAGS = ("h1", "h2", "h3")
+
+
+Extractor = Callable[[Path], Iterator[Union[str, "ChapterBreak"]]]
+
+
+@functools.lru_cache(maxsize=None)
+def _lxml_html() -> Optional[ModuleType]:
+    try:
+        import lxml.html
+    except ImportError:  # optional speed-up for EPUB
+        return None
+    return lxml.html
+
+
+class ChapterBreak(NamedTuple):
+    """Pipeline marker: a natural chapter (e.g. an EPUB spine document) starts here."""
+
+    title: Optional[str]
+
+
+def extract_pdf_range(file_path: str, start: int, stop: int) -> List[str]:
+    """
+    Extract pages ``start:stop`` with PyMuPDF. Only pages PyMuPDF fails on
+    are retried with the much slower pdfplumber. Runs in worker processes.
+    """
+    import fitz
+
+    pages: List[str] = []
+    try:
+        doc = fitz.open(file_path)
+    except Exception:
+        doc = None
+    fallback = None
+    try:
+        for number in range(start, stop):
+            text = None
+            if doc is not None:
+                try:
+                    text = doc[number].get_text("text")
+                except Exception:
+                    text = None
+            if text is None:
+                if fallback is None:
+                    import pdfplumber  # only needed for pages PyMuPDF cannot read
+
+                    fallback = pdfplumber.open(file_path)
+                page = fallback.pages[number]
+                text = page.extract_text() or ""
+                page.flush_cache()
+            pages.append(text)
+    finally:
+        if doc is not None:
+            doc.close()
+        if fallback is not None:
+            fallback.close()
+    return pages
+
+
+def epub_spine(archive: zipfile.ZipFile) -> List[str]:
+    """
+    Archive member names of the book's reading order: linear spine items that
+    are (X)HTML, skipping the EPUB 3 navigation document. Falls back to
+    manifest order when the spine is empty.
+    """
+    container = ElementTree.fromstring(archive.read("META-INF/container.xml"))
+    rootfile = container.find(f".//{CONTAINER_NS}rootfile")
+    if rootfile is None:
+        raise ValueError("EPUB container has no rootfile")
+    opf_path = rootfile.get("full-path", "")
+    opf = ElementTree.fromstring(archive.read(opf_path))
+    opf_dir = posixpath.dirname(opf_path)
+
+    manifest = {}
+    for item in opf.iterfind(f"{OPF_NS}manifest/{OPF_NS}item"):
+        if item.get("media-type") not in HTML_MEDIA_TYPES or "nav" in (item.get("properties") or "").split():
+            continue
+        href = unquote(item.get("href", "").split("#", 1)[0])
+        manifest[item.get("id")] = posixpath.normpath(posixpath.join(opf_dir, href))
+
+    names = [
+        manifest[itemref.get("idref")]
+        for itemref in opf.iterfind(f"{OPF_NS}spine/{OPF_NS}itemref")
+        if itemref.get("linear") != "no" and itemref.get("idref") in manifest
+    ]
+    return names or list(manifest.values())
+
+
+def extract_epub_documents(file_path: str, names: List[str]) -> List[Tuple[Optional[str], List[str]]]:
+    """
+    ``(title, paragraphs)`` for each named spine document, in order. Parsed
+    with lxml when it is installed, else BeautifulSoup. Runs in worker processes.
+    """
+    results = []
+    with zipfile.ZipFile(file_path) as archive:
+        for name in names:
+            try:
+                content = archive.read(name)
+            except KeyError:
+                continue
+            parse = _parse_xhtml_lxml if _lxml_html() is not None else _parse_xhtml_bs4
+            results.append(parse(content))
+    return results
+
+
+def _parse_xhtml_lxml(content: bytes) -> Tuple[Optional[str], List[str]]:
+    try:
+        doc = _lxml_html().document_fromstring(content)
+    except Exception:  # empty or unparseable document
+        return None, []
+    for br in doc.iter("br"):
+        br.tail = "\n" + (br.tail or "")
+    body = doc.find("body")
+    if body is None:
+        body = doc
+
+    paragraphs: List[str] = []
+    run: List[str] = []
+    _collect_blocks(body, paragraphs, run)
+    _end_paragraph(paragraphs, run)
+
+    heading = next(body.iter(*HEADING_TAGS), None)
+    title = _clean_lines(heading.text_content()) if heading is not None else doc.findtext(".//title")
+    return (title.strip() or None) if title else None, paragraphs
+
+
+def _collect_blocks(element, paragraphs: List[str], run: List[str]) -> None:
+    """
+    Walk ``element`` once, adding its text to ``run`` and ending a paragraph
+    at every block boundary. Text a container holds outside its nested
+    blocks (before, between or after them) becomes paragraphs of its own.
+    """
+    block = element.tag in BLOCK_TAGS
+    if block:
+        _end_paragraph(paragraphs, run)
+    if element.text:
+        run.append(element.text)
+    for child in element:
+        if isinstance(child.tag, str):  # comments and processing instructions only keep their tail
+            _collect_blocks(child, paragraphs, run)
+        if child.tail:
+            run.append(child.tail)
+    if block:
+        _end_paragraph(paragraphs, run)
+
+
+def _end_paragraph(paragraphs: List[str], run: List[str]) -> None:
+    text = _clean_lines("".join(run))
+    run.clear()
+    if text:
+        paragraphs.append(text)
+
+
+def _parse_xhtml_bs4(content: bytes) -> Tuple[Optional[str], List[str]]:
+    # Without lxml: keep to a single get_text pass; paragraphs are split downstream
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(content, "html.parser")
+    body = soup.body or soup
+    text = body.get_text(separator="\n").strip()
+    heading = body.find(HEADING_TAGS)
+    title = _clean_lines(heading.get_text()) if heading is not None else (soup.title.string if soup.title else None)
+    return (title.strip() or None) if title else None, [text] if text else []
+
+
+def _clean_lines(text: str) -> str:
+    """Collapse whitespace within lines, keeping explicit (``<br>``) line breaks."""
+    lines = (" ".join(line.split()) for line in text.split("\n"))
+    return "\n".join(line for line in lines if line)
 
 
 class DocumentIngestionService:
+    """
+    Turns an uploaded document into chapters of paragraphs as a generator
+    pipeline: extracted pages/items -> paragraphs -> chapters -> storage.
+    Each stage holds at most one read chunk, page or chapter at a time, so
+    peak memory is bounded by the ``ingestion_*`` settings, not document size.
+    """
+
     def __init__(self) -> None:
         self.paragraph_re = re.compile(r"\s*\n\s*\n")
+        # File suffix -> extractor; each extractor imports its parser on first call
+        self.extractors: Dict[str, Extractor] = {}
+        self.register_extractor((".pdf",), self._extract_pdf)
+        self.register_extractor((".epub",), self._extract_epub)
+        self.register_extractor((".txt", ".md"), self._extract_plain)
+        self.register_extractor((".docx",), self._extract_docx)
 
-    def ingest(self, file_path: Path, book_id: str, title: str | None = None) -> dict:
-        text = self._extract_text(file_path)
-        paragraphs = self._split_paragraphs(text)
-        chapters = self._build_chapters(paragraphs)
+    def register_extractor(self, suffixes: Iterable[str], extractor: Extractor) -> None:
+        for suffix in suffixes:
+            self.extractors[suffix.lower()] = extractor
 
+    def ingest(self, file_path: Path, book_id: str, title: str | None = None) -> dict:
+        """Return the whole book structure in memory; prefer ``ingest_to_storage`` for uploads."""
+        timings: Dict[str, float] = {}
+        chapters = list(self._timed_chapters(file_path, timings))
+        self._record_metrics(file_path, timings)
         return {
             "book_id": book_id,
             "title": title or file_path.stem,
             "chapters": chapters,
         }
 
-    def _extract_text(self, file_path: Path) -> str:
+    def ingest_to_storage(self, file_path: Path, book_id: str, title: str | None = None) -> Path:
+        """Stream the document straight into the book's paragraph store; returns the TOC path."""
+        timings: Dict[str, float] = {}
+        started = time.perf_counter()
+        toc_path = storage_service.save_chapters(
+            book_id, title or file_path.stem, self._timed_chapters(file_path, timings)
+        )
+        timings["persist"] = time.perf_counter() - started
+        self._record_metrics(file_path, timings)
+        return toc_path
+
+    def iter_chapters(self, file_path: Path) -> Iterator[dict]:
+        return self._build_chapters(self._split_paragraphs(self._extract_text(file_path)))
+
+    def _timed_chapters(self, file_path: Path, timings: Dict[str, float]) -> Iterator[dict]:
+        """``iter_chapters`` that adds each stage's cumulative time (and the paragraph count) to ``timings``."""
+        pieces = timed_iter(self._extract_text(file_path), timings, "extract")
+        paragraphs = timed_iter(self._split_paragraphs(pieces), timings, "split")
+        timings["paragraphs"] = 0
+        for chapter in timed_iter(self._build_chapters(paragraphs), timings, "chapter"):
+            timings["paragraphs"] += len(chapter["paragraphs"])
+            yield chapter
+
+    def _record_metrics(self, file_path: Path, timings: Dict[str, float]) -> None:
+        # Each stage's time includes its upstream stages; report them exclusively
+        fmt = file_path.suffix.lower().lstrip(".")
+        stages = {
+            "extract": timings["extract"],
+            "split": timings["split"] - timings["extract"],
+            "chapter": timings["chapter"] - timings["split"],
+        }
+        if "persist" in timings:
+            stages["persist"] = timings["persist"] - timings["chapter"]
+        for stage, seconds in stages.items():
+            INGESTION_STAGE_SECONDS.observe(max(0.0, seconds), stage, fmt)
+        INGESTION_BYTES.inc(fmt, amount=file_path.stat().st_size)
+        INGESTION_PARAGRAPHS.inc(fmt, amount=timings["paragraphs"])
+
+    def _extract_text(self, file_path: Path) -> Iterator[Union[str, ChapterBreak]]:
+        """
+        Yield the document's text in pieces that concatenate to the full text,
+        with a ``ChapterBreak`` wherever the format has real chapter boundaries.
+        """
         suffix = file_path.suffix.lower()
-        if suffix == ".pdf":
-            return self._extract_pdf(file_path)
-        if suffix == ".epub":
-            return self._extract_epub(file_path)
-        if suffix in {".txt", ".md"}:
-            return file_path.read_text(encoding="utf-8", errors="ignore")
-        if suffix in {".docx"}:
-            return docx2txt.process(str(file_path)) or ""
-        raise ValueError(f"Unsupported file type: {suffix}")
-
-    def _extract_pdf(self, file_path: Path) -> str:
-        text_parts: List[str] = []
+        extractor = self.extractors.get(suffix)
+        if extractor is None:
+            raise ValueError(f"Unsupported file type: {suffix}")
+        return extractor(file_path)
+
+    def _extract_plain(self, file_path: Path) -> Iterator[str]:
+        with file_path.open("r", encoding="utf-8", errors="ignore") as f:
+            while True:
+                chunk = f.read(settings.ingestion_read_chunk_bytes)
+                if not chunk:
+                    break
+                yield chunk
+
+    def _extract_pdf(self, file_path: Path) -> Iterator[str]:
+        import fitz
+
         try:
             with fitz.open(file_path) as doc:
-                for page in doc:
-                    text_parts.append(page.get_text("text"))
-        except Exception:  # PyMuPDF failed; try pdfplumber
+                page_count = doc.page_count
+        except Exception:  # PyMuPDF cannot open it at all; pdfplumber does every page
+            import pdfplumber
+
             with pdfplumber.open(file_path) as doc:
-                for page in doc.pages:
-                    text_parts.append(page.extract_text() or "")
-        return "\n".join(text_parts)
-
-    def _extract_epub(self, file_path: Path) -> str:
-        book = epub.read_epub(str(file_path))
-        texts: List[str] = []
-        for item in book.get_items():
-            if item.get_type() == epub.EpubHtml:
-                soup = BeautifulSoup(item.get_body_content(), "html.parser")
-                texts.append(soup.get_text(separator="\n"))
-        return "\n".join(texts)
-
-    def _split_paragraphs(self, text: str) -> List[str]:
-        raw_paragraphs = [p.strip() for p in self.paragraph_re.split(text) if p.strip()]
-        if not raw_paragraphs:
-            raw_paragraphs = [line.strip() for line in text.splitlines() if line.strip()]
-        return raw_paragraphs
-
-    def _build_chapters(self, paragraphs: List[str]) -> List[dict]:
-        if not paragraphs:
-            return []
-        chunk_size = 40
-        chapters = []
-        for index in range(0, len(paragraphs), chunk_size):
-            chunk = paragraphs[index : index + chunk_size]
-            chapter_id = str(len(chapters) + 1)
-            chapter_title = f"Chapter {chapter_id}"
-            chapters.append(
-                {
-                    "chapter_id": chapter_id,
-                    "title": chapter_title,
-                    "paragraphs": chunk,
-                }
-            )
-        return chapters
+                page_count = len(doc.pages)
+
+        per_range = max(1, settings.pdf_pages_per_range)
+        ranges = [(str(file_path), start, min(start + per_range, page_count)) for start in range(0, page_count, per_range)]
+        if self._extract_workers() > 1 and page_count >= settings.pdf_parallel_min_pages:
+            results = self._ordered_parallel(extract_pdf_range, ranges)
+        else:
+            results = (extract_pdf_range(*args) for args in ranges)
+        for pages in results:
+            for text in pages:
+                yield text + "\n"
+
+    def _extract_epub(self, file_path: Path) -> Iterator[Union[str, ChapterBreak]]:
+        # Each spine document becomes its own chapter, extracted in order
+        with zipfile.ZipFile(file_path) as archive:
+            names = epub_spine(archive)
+        per_task = max(1, settings.epub_documents_per_task)
+        tasks = [(str(file_path), names[start:start + per_task]) for start in range(0, len(names), per_task)]
+        if self._extract_workers() > 1 and len(names) >= settings.epub_parallel_min_documents:
+            results = self._ordered_parallel(extract_epub_documents, tasks)
+        else:
+            results = (extract_epub_documents(*args) for args in tasks)
+        for documents in results:
+            for title, paragraphs in documents:
+                if not paragraphs:
+                    continue
+                yield ChapterBreak(title)
+                for paragraph in paragraphs:
+                    yield paragraph + "\n\n"
+
+    def _extract_workers(self) -> int:
+        """Extraction processes per import: the ``extract_workers`` budget split across ingestion workers."""
+        total = settings.extract_workers or os.cpu_count() or 1
+        return max(1, total // max(1, settings.ingestion_workers))
+
+    def _ordered_parallel(self, func: Callable[..., Any], tasks: List[Tuple]) -> Iterator[Any]:
+        """
+        Run ``func(*task)`` in a process pool, yielding results in task order.
+        The pool lives only as long as this one extraction, so no idle
+        processes are left behind once the import finishes.
+        """
+        workers = self._extract_workers()
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        # Keep a bounded window of tasks in flight
+        window_size = workers * 2
+        pending = iter(tasks)
+        window: Deque[Future] = deque()
+        try:
+            for args in pending:
+                window.append(pool.submit(func, *args))
+                if len(window) >= window_size:
+                    break
+            while window:
+                result = window.popleft().result()
+                next_args = next(pending, None)
+                if next_args is not None:
+                    window.append(pool.submit(func, *next_args))
+                yield result
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _extract_docx(self, file_path: Path) -> Iterator[str]:
+        # Same text rules as docx2txt, but parsed incrementally one <w:p> at a time
+        with zipfile.ZipFile(file_path) as archive, archive.open("word/document.xml") as xml:
+            parts: List[str] = []
+            stack: List[ElementTree.Element] = []
+            for event, elem in ElementTree.iterparse(xml, events=("start", "end")):
+                if event == "start":
+                    stack.append(elem)
+                    continue
+                stack.pop()
+                tag = elem.tag
+                if tag == f"{WORD_NS}t":
+                    parts.append(elem.text or "")
+                elif tag == f"{WORD_NS}tab":
+                    parts.append("\t")
+                elif tag in (f"{WORD_NS}br", f"{WORD_NS}cr"):
+                    parts.append("\n")
+                elif tag == f"{WORD_NS}p":
+                    yield "\n\n" + "".join(parts)
+                    parts.clear()
+                # Drop finished top-level blocks so the parsed tree never grows
+                if stack and stack[-1].tag == f"{WORD_NS}body":
+                    stack[-1].remove(elem)
+
+    def _split_paragraphs(self, pieces: Iterable[Union[str, ChapterBreak]]) -> Iterator[Union[str, ChapterBreak]]:
+        max_chars = settings.ingestion_max_paragraph_chars
+        carry = ""
+        for piece in pieces:
+            if isinstance(piece, ChapterBreak):
+                carry = carry.strip()
+                if carry:
+                    yield carry
+                carry = ""
+                yield piece
+                continue
+            carry += piece
+            *complete, carry = self.paragraph_re.split(carry)
+            for paragraph in complete:
+                paragraph = paragraph.strip()
+                if paragraph:
+                    yield paragraph
+            # No blank line for a long stretch: cut at a line break so the
+            # buffer (and the paragraph) stays bounded
+            while len(carry) > max_chars:
+                cut = carry.rfind("\n", 0, max_chars)
+                if cut <= 0:
+                    cut = carry.rfind(" ", 0, max_chars)
+                if cut <= 0:
+                    cut = max_chars
+                paragraph, carry = carry[:cut].strip(), carry[cut:]
+                if paragraph:
+                    yield paragraph
+        carry = carry.strip()
+        if carry:
+            yield carry
+
+    def _build_chapters(self, paragraphs: Iterable[Union[str, ChapterBreak]]) -> Iterator[dict]:
+        """
+        Group paragraphs into chapters. Formats with natural chapters mark them
+        with ``ChapterBreak``; everything else is cut every ``ingestion_chapter_size``
+        paragraphs.
+        """
+        chunk_size = settings.ingestion_chapter_size
+        chunk: List[str] = []
+        chapter_count = 0
+        title: Optional[str] = None
+        natural = False
+        for paragraph in paragraphs:
+            if isinstance(paragraph, ChapterBreak):
+                if chunk:
+                    chapter_count += 1
+                    yield self._chapter(chapter_count, chunk, title)
+                    chunk = []
+                title, natural = paragraph.title, True
+                continue
+            chunk.append(paragraph)
+            if not natural and len(chunk) == chunk_size:
+                chapter_count += 1
+                yield self._chapter(chapter_count, chunk)
+                chunk = []
+        if chunk:
+            yield self._chapter(chapter_count + 1, chunk, title)
+
+    def _chapter(self, number: int, paragraphs: List[str], title: Optional[str] = None) -> dict:
+        chapter_id = str(number)
+        return {
+            "chapter_id": chapter_id,
+            "title": title or f"Chapter {chapter_id}",
+            "paragraphs": paragraphs,
+        }
 
 
 ingestion_service = DocumentIngestionService()
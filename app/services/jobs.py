@@ -0,0 +1,225 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import get_session
+from ..models import IngestionJob
+from .books import book_service
+from .ingestion import ingestion_service
+from .metrics import INGESTION_JOBS, registry
+from .search import search_service
+from .singleflight import file_lock
+from .storage import storage_service
+from .storage_manager import storage_manager
+
+logger = logging.getLogger(__name__)
+
+
+def run_ingestion_job(job_id: str) -> str:
+    """
+    Process-pool entry point: parse, store and register one queued upload.
+
+    The job is claimed with a conditional UPDATE so that a job dispatched
+    twice (e.g. after a restart) is only ever ingested once. Jobs for the
+    same file hold a per-hash lock, so a duplicate waits for the first and
+    then points at its book instead of parsing the file again.
+    """
+    with get_session() as session:
+        claimed = session.execute(
+            update(IngestionJob)
+            .where(IngestionJob.id == job_id, IngestionJob.status == "queued")
+            .values(status="running", updated_at=datetime.utcnow())
+        )
+        session.commit()
+        if claimed.rowcount == 0:
+            return "skipped"
+
+        job = session.get(IngestionJob, job_id)
+        if not job.content_hash:
+            return _ingest(session, job)
+        with file_lock("ingest", job.content_hash):
+            # The same file may have finished importing since this job was queued
+            existing = book_service.get_book_by_hash(session, job.content_hash)
+            if existing:
+                job.book_id = existing.id
+                job.status = "completed"
+                session.commit()
+                return job.status
+            return _ingest(session, job)
+
+
+def _ingest(session: Session, job: IngestionJob) -> str:
+    try:
+        upload_path = Path(job.upload_path)
+        title = job.title or upload_path.stem
+        text_path = ingestion_service.ingest_to_storage(upload_path, job.book_id, title)
+        book_service.create_book(
+            session,
+            title=title,
+            filename=job.filename,
+            content_path=text_path,
+            book_id=job.book_id,
+            content_hash=job.content_hash,
+        )
+        try:
+            search_service.index_book(session, job.book_id)
+        except Exception:
+            # Searching the book later indexes it on demand; don't fail the import
+            session.rollback()
+            logger.exception("Full-text indexing failed for book %s", job.book_id)
+        job.status = "completed"
+    except Exception as exc:
+        session.rollback()
+        logger.exception("Ingestion job %s failed", job.id)
+        job.status = "failed"
+        job.error = str(exc) or exc.__class__.__name__
+    session.commit()
+    # Tracked either way: a failed import's directory is unreferenced and can be evicted
+    storage_manager.touch(storage_service.base_books_dir / job.book_id)
+    return job.status
+
+
+def run_ingestion_job_with_metrics(job_id: str) -> Tuple[str, Dict[str, Any]]:
+    """Worker entry point: run the job and hand the metrics it recorded back to the server process."""
+    status = run_ingestion_job(job_id)
+    INGESTION_JOBS.inc(status)
+    # Workers have no sweep task of their own; record the book directory now
+    storage_manager.flush()
+    return status, registry.drain()
+
+
+class IngestionJobService:
+    """
+    Queues uploads for ingestion in a size-limited process pool, so CPU-bound
+    parsing never competes with request handling for the GIL. Job state lives
+    in the database; unfinished jobs are picked up again on startup.
+    """
+
+    def __init__(self) -> None:
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        if self._executor is None:
+            self._executor = self._new_executor()
+        for job_id in await run_in_threadpool(self._recover_jobs):
+            self.dispatch(job_id)
+
+    async def stop(self) -> None:
+        executor, self._executor = self._executor, None
+        for task in self._tasks:
+            task.cancel()
+        if executor is not None:
+            # Unfinished jobs stay queued/running in the DB and resume on restart
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def create_job(
+        self,
+        session: Session,
+        *,
+        filename: str,
+        upload_path: Path,
+        title: str,
+        content_hash: Optional[str] = None,
+        book_id: Optional[str] = None,
+        status: str = "queued",
+    ) -> IngestionJob:
+        job = IngestionJob(
+            filename=filename,
+            upload_path=str(upload_path),
+            title=title,
+            content_hash=content_hash,
+            book_id=book_id,
+            status=status,
+        )
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+        return job
+
+    def get_job(self, session: Session, job_id: str) -> IngestionJob | None:
+        return session.get(IngestionJob, job_id)
+
+    def get_active_job(self, session: Session, content_hash: str) -> IngestionJob | None:
+        result = session.execute(
+            select(IngestionJob)
+            .where(IngestionJob.content_hash == content_hash, IngestionJob.status.in_(("queued", "running")))
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
+    def is_ingesting(self, session: Session, book_id: str) -> bool:
+        """Whether an import of this book is queued or running (it may already have a ``Book`` row)."""
+        result = session.execute(
+            select(IngestionJob.id)
+            .where(IngestionJob.book_id == book_id, IngestionJob.status.in_(("queued", "running")))
+            .limit(1)
+        )
+        return result.first() is not None
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # spawn: workers must not inherit the server's threads or open SQLite handles
+        return ProcessPoolExecutor(
+            max_workers=settings.ingestion_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    def _recover_jobs(self) -> List[str]:
+        with get_session() as session:
+            # Anything still "running" was interrupted by a shutdown or crash
+            session.execute(
+                update(IngestionJob)
+                .where(IngestionJob.status == "running")
+                .values(status="queued", updated_at=datetime.utcnow())
+            )
+            session.commit()
+            result = session.execute(
+                select(IngestionJob.id).where(IngestionJob.status == "queued").order_by(IngestionJob.created_at)
+            )
+            return list(result.scalars().all())
+
+    def dispatch(self, job_id: str) -> None:
+        task = asyncio.create_task(self._run(job_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, job_id: str) -> None:
+        executor = self._executor
+        if executor is None:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            _, snapshot = await loop.run_in_executor(executor, run_ingestion_job_with_metrics, job_id)
+            registry.merge(snapshot)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed). Replace the pool once, fail the
+            # job that was running and re-dispatch jobs that never started.
+            if self._executor is executor:
+                logger.error("Ingestion worker pool crashed; restarting it")
+                self._executor = self._new_executor()
+            if await run_in_threadpool(self._fail_if_running, job_id, "Ingestion worker crashed"):
+                return
+            self.dispatch(job_id)
+
+    def _fail_if_running(self, job_id: str, error: str) -> bool:
+        with get_session() as session:
+            result = session.execute(
+                update(IngestionJob)
+                .where(IngestionJob.id == job_id, IngestionJob.status == "running")
+                .values(status="failed", error=error, updated_at=datetime.utcnow())
+            )
+            session.commit()
+            return result.rowcount > 0
+
+
+ingestion_jobs = IngestionJobService()
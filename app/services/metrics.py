@@ -0,0 +1,293 @@
+import bisect
+import math
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Sequence[Any]) -> LabelValues:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels!r}")
+        return tuple(str(label) for label in labels)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: Any, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, *labels: Any) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+    def _drain(self) -> Dict[LabelValues, Any]:
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def _merge(self, values: Dict[LabelValues, Any]) -> None:
+        with self._lock:
+            for key, value in values.items():
+                self._values[key] = self._values.get(key, 0.0) + value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: Any, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, *labels: Any, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (non-cumulative, +Inf last), sum]
+        self._values: Dict[LabelValues, List[Any]] = {}
+
+    def observe(self, value: float, *labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def time(self, *labels: Any) -> "_Timer":
+        return _Timer(self, labels)
+
+    def count(self, *labels: Any) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(entry[0]), entry[1]) for key, entry in self._values.items()]
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames + ("le",), key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+    def _drain(self) -> Dict[LabelValues, Any]:
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def _merge(self, values: Dict[LabelValues, Any]) -> None:
+        with self._lock:
+            for key, (counts, total) in values.items():
+                entry = self._values.get(key)
+                if entry is None:
+                    entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+                for index, count in enumerate(counts):
+                    entry[0][index] += count
+                entry[1] += total
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: Histogram, labels: Sequence[Any]) -> None:
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+
+class MetricsRegistry:
+    """
+    Minimal in-process Prometheus registry: counters, gauges and histograms
+    guarded by one lock per metric, rendered in the text exposition format.
+
+    Worker processes (ingestion) ``drain`` their counters and histograms and
+    hand the snapshot back to the server process, which ``merge``s it.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric: _Metric) -> Any:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def drain(self) -> Dict[str, Dict[LabelValues, Any]]:
+        """Take (and reset) every counter and histogram value; gauges are process-local."""
+        snapshot = {}
+        for name, metric in self._metrics.items():
+            if isinstance(metric, (Counter, Histogram)):
+                values = metric._drain()
+                if values:
+                    snapshot[name] = values
+        return snapshot
+
+    def merge(self, snapshot: Optional[Dict[str, Dict[LabelValues, Any]]]) -> None:
+        for name, values in (snapshot or {}).items():
+            metric = self._metrics.get(name)
+            if isinstance(metric, (Counter, Histogram)):
+                metric._merge(values)
+
+
+def timed_iter(iterable: Iterable[T], totals: Dict[str, float], stage: str) -> Iterator[T]:
+    """
+    Yield from ``iterable``, adding the time spent producing each item to
+    ``totals[stage]``. Nested stages include their upstream's time; callers
+    subtract it to get per-stage (exclusive) durations.
+    """
+    totals.setdefault(stage, 0.0)
+    iterator = iter(iterable)
+    while True:
+        started = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            totals[stage] += time.perf_counter() - started
+            return
+        totals[stage] += time.perf_counter() - started
+        yield item
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "readme_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route", "status"),
+)
+INGESTION_STAGE_SECONDS = registry.histogram(
+    "readme_ingestion_stage_seconds",
+    "Time per ingestion stage (extract, split, chapter, persist) per document",
+    ("stage", "format"),
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0),
+)
+INGESTION_BYTES = registry.counter("readme_ingestion_bytes_total", "Bytes of uploaded documents ingested", ("format",))
+INGESTION_PARAGRAPHS = registry.counter("readme_ingestion_paragraphs_total", "Paragraphs extracted", ("format",))
+INGESTION_JOBS = registry.counter("readme_ingestion_jobs_total", "Finished ingestion jobs", ("status",))
+TTS_REQUEST_SECONDS = registry.histogram(
+    "readme_tts_request_seconds", "Latency of requests to the Coqui TTS service", ("outcome",)
+)
+TTS_ERRORS = registry.counter("readme_tts_errors_total", "Failed or rejected Coqui TTS requests", ("reason",))
+TTS_IN_FLIGHT = registry.gauge("readme_tts_in_flight", "Coqui TTS requests currently in flight")
+TTS_WAITING = registry.gauge("readme_tts_waiting", "TTS requests waiting for a Coqui slot")
+DB_SESSION_SECONDS = registry.histogram("readme_db_session_seconds", "Database session lifetime", ("kind",))
+CACHE_REQUESTS = registry.counter("readme_cache_requests_total", "Cache lookups", ("cache", "result"))
+STORAGE_BYTES = registry.gauge("readme_storage_bytes", "Tracked bytes per storage area", ("area",))
+STORAGE_RECLAIMED_BYTES = registry.counter(
+    "readme_storage_reclaimed_bytes_total", "Bytes freed by quota eviction", ("area",)
+)
+STORAGE_RECLAIMED_FILES = registry.counter(
+    "readme_storage_reclaimed_files_total", "Files (or book directories) evicted", ("area",)
+)
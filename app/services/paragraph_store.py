@@ -0,0 +1,157 @@
+import hashlib
+import mmap
+import struct
+import uuid
+from array import array
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+BLOB_NAME = "paragraphs.bin"
+INDEX_NAME = "paragraphs.idx"
+
+# Index layout (little endian):
+#   header: magic, version, reserved, paragraph count, chapter count
+#   uint64 byte offset of each paragraph in the blob, plus one end offset
+#   uint64 first paragraph of each chapter, plus one end marker
+INDEX_MAGIC = b"RMPS"
+INDEX_VERSION = 1
+HEADER = struct.Struct("<4sHHQQ")
+
+
+class ParagraphStoreWriter:
+    """Appends chapters to a paragraph store; nothing is readable until ``close``."""
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self._blob_tmp = directory / f".{BLOB_NAME}.{uuid.uuid4().hex}"
+        self._blob = self._blob_tmp.open("wb")
+        self._offsets = array("Q", [0])
+        self._chapter_starts = array("Q")
+        self._position = 0
+        self._hash = hashlib.sha256()
+        self.digest: Optional[str] = None
+
+    @property
+    def paragraph_count(self) -> int:
+        return len(self._offsets) - 1
+
+    def start_chapter(self) -> int:
+        """Begin a new chapter; returns the global index of its first paragraph."""
+        self._chapter_starts.append(self.paragraph_count)
+        return self.paragraph_count
+
+    def add_paragraph(self, text: str) -> None:
+        data = text.encode("utf-8")
+        self._blob.write(data)
+        self._hash.update(data)
+        self._position += len(data)
+        self._offsets.append(self._position)
+
+    def add_chapter(self, paragraphs: Iterable[str]) -> int:
+        first = self.start_chapter()
+        for paragraph in paragraphs:
+            self.add_paragraph(paragraph)
+        return first
+
+    def close(self) -> None:
+        self._blob.close()
+        chapter_starts = array("Q", self._chapter_starts)
+        chapter_starts.append(self.paragraph_count)
+
+        index_tmp = self.directory / f".{INDEX_NAME}.{uuid.uuid4().hex}"
+        with index_tmp.open("wb") as f:
+            f.write(HEADER.pack(INDEX_MAGIC, INDEX_VERSION, 0, self.paragraph_count, len(self._chapter_starts)))
+            self._offsets.tofile(f)
+            chapter_starts.tofile(f)
+        self._hash.update(self._offsets.tobytes())
+        self._hash.update(chapter_starts.tobytes())
+        self.digest = self._hash.hexdigest()
+        self._blob_tmp.replace(self.directory / BLOB_NAME)
+        index_tmp.replace(self.directory / INDEX_NAME)
+
+    def abort(self) -> None:
+        self._blob.close()
+        self._blob_tmp.unlink(missing_ok=True)
+
+
+def store_digest(directory: Path) -> str:
+    """Hash an existing store the same way ``ParagraphStoreWriter`` does while writing."""
+    digest = hashlib.sha256()
+    with (directory / BLOB_NAME).open("rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    with (directory / INDEX_NAME).open("rb") as f:
+        f.seek(HEADER.size)
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ParagraphStore:
+    """
+    Read-only, memory-mapped view of a book's paragraphs. Paragraph ``k`` is
+    the blob slice between offsets ``k`` and ``k + 1``, so reading a range
+    touches only the pages holding that range.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self._index_mm = self._map(directory / INDEX_NAME)
+        self._blob_mm = self._map(directory / BLOB_NAME)
+        magic, version, _, paragraph_count, chapter_count = HEADER.unpack_from(self._index_mm, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            self.close()
+            raise ValueError(f"Unrecognized paragraph index in {directory}")
+
+        table = memoryview(self._index_mm)[HEADER.size :].cast("Q")
+        self._table = table
+        self._offsets = table[: paragraph_count + 1]
+        self._chapter_starts = table[paragraph_count + 1 : paragraph_count + chapter_count + 2]
+        self._blob = memoryview(self._blob_mm) if self._blob_mm is not None else memoryview(b"")
+        self.paragraph_count = paragraph_count
+        self.chapter_count = chapter_count
+
+    @staticmethod
+    def _map(path: Path) -> Optional[mmap.mmap]:
+        with path.open("rb") as f:
+            if path.stat().st_size == 0:
+                return None  # mmap cannot map empty files
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return self.paragraph_count
+
+    def paragraph(self, index: int) -> str:
+        if not 0 <= index < self.paragraph_count:
+            raise IndexError(index)
+        return str(self._blob[self._offsets[index] : self._offsets[index + 1]], "utf-8")
+
+    def paragraphs(self, start: int, stop: int) -> List[str]:
+        start = max(0, start)
+        stop = min(stop, self.paragraph_count)
+        offsets = self._offsets[start : stop + 1].tolist()
+        blob = self._blob
+        return [str(blob[a:b], "utf-8") for a, b in zip(offsets, offsets[1:])]
+
+    def chapter_range(self, chapter_index: int) -> range:
+        if not 0 <= chapter_index < self.chapter_count:
+            raise IndexError(chapter_index)
+        return range(self._chapter_starts[chapter_index], self._chapter_starts[chapter_index + 1])
+
+    def chapter_paragraphs(self, chapter_index: int) -> List[str]:
+        bounds = self.chapter_range(chapter_index)
+        return self.paragraphs(bounds.start, bounds.stop)
+
+    def close(self) -> None:
+        for name in ("_offsets", "_chapter_starts", "_table", "_blob"):
+            view = getattr(self, name, None)
+            if view is not None:
+                view.release()
+        for mm in (self._index_mm, self._blob_mm):
+            if mm is not None:
+                mm.close()
+
+    def __enter__(self) -> "ParagraphStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from ..config import settings
+from .storage import storage_service
+from .tts import TTSOverloadedError, tts_service
+
+logger = logging.getLogger(__name__)
+
+
+class TTSPrefetcher:
+    """
+    Synthesizes the paragraphs just ahead of a reader's position in the
+    background, so the next play request is a synthesis cache hit.
+
+    ``schedule`` may be called from any thread; the workers run on the
+    app's event loop between ``start`` and ``stop``.
+    """
+
+    def __init__(self) -> None:
+        self.lookahead = settings.tts_prefetch_lookahead
+        self.concurrency = settings.tts_prefetch_concurrency
+        self.cancel_on_jump = settings.tts_prefetch_cancel_on_jump
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._positions: Dict[str, Tuple[str, int]] = {}
+        self._positions_lock = threading.Lock()
+        self._generations: Dict[str, int] = {}
+        self._in_flight: Dict[str, Dict[str, asyncio.Task]] = {}
+
+    async def start(self) -> None:
+        if not settings.tts_prefetch_enabled or self._workers:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=settings.tts_prefetch_queue_size)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        workers, self._workers = self._workers, []
+        for tasks in self._in_flight.values():
+            for task in tasks.values():
+                task.cancel()
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._loop = None
+        self._queue = None
+        self._in_flight.clear()
+
+    def schedule(self, book_id: str, chapter_id: Optional[str], paragraph_index: Optional[int]) -> None:
+        loop = self._loop
+        if loop is None or chapter_id is None or paragraph_index is None:
+            return
+        position = (chapter_id, paragraph_index)
+        with self._positions_lock:
+            if self._positions.get(book_id) == position:
+                return
+            self._positions[book_id] = position
+
+        try:
+            texts = self._upcoming_paragraphs(book_id, chapter_id, paragraph_index)
+        except FileNotFoundError:
+            return
+        loop.call_soon_threadsafe(self._enqueue, book_id, texts)
+
+    def _upcoming_paragraphs(self, book_id: str, chapter_id: str, paragraph_index: int) -> List[str]:
+        chapters = storage_service.load_toc(book_id)["chapters"]
+        entry = next((c for c in chapters if c["chapter_id"] == chapter_id), None)
+        if entry is None:
+            return []
+        start = entry["first_paragraph"] + paragraph_index + 1
+        return storage_service.load_paragraphs(book_id, start, start + self.lookahead)
+
+    def _enqueue(self, book_id: str, texts: List[str]) -> None:
+        if self._queue is None:
+            return
+        generation = self._generations.get(book_id, 0) + 1
+        self._generations[book_id] = generation
+
+        in_flight = self._in_flight.setdefault(book_id, {})
+        if self.cancel_on_jump:
+            # Keep work that is still in the new window; drop the rest
+            for text, task in list(in_flight.items()):
+                if text not in texts:
+                    task.cancel()
+
+        for text in texts:
+            if text in in_flight:
+                continue
+            try:
+                self._queue.put_nowait((book_id, generation, text))
+            except asyncio.QueueFull:
+                logger.debug("TTS prefetch queue full; dropping paragraph for %s", book_id)
+                break
+
+    async def _worker(self) -> None:
+        while True:
+            book_id, generation, text = await self._queue.get()
+            try:
+                if self.cancel_on_jump and generation != self._generations.get(book_id):
+                    continue  # reader moved on before we got to it
+                in_flight = self._in_flight.setdefault(book_id, {})
+                if text in in_flight:
+                    continue
+                task = asyncio.create_task(tts_service.synthesize(text, background=True))
+                in_flight[text] = task
+                try:
+                    await asyncio.wait({task})
+                finally:
+                    in_flight.pop(text, None)
+                exc = None if task.cancelled() else task.exception()
+                if isinstance(exc, TTSOverloadedError):
+                    logger.debug("Skipping TTS prefetch for %s: service overloaded", book_id)
+                elif exc is not None:
+                    logger.warning("TTS prefetch failed for %s: %s", book_id, exc)
+            finally:
+                self._queue.task_done()
+
+
+tts_prefetcher = TTSPrefetcher()
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy.dialects.sqlite import insert
+
+from ..config import settings
+from ..database import get_async_session
+from ..models import Progress
+
+logger = logging.getLogger(__name__)
+
+Position = Tuple[Optional[str], Optional[int]]
+
+
+class ProgressBuffer:
+    """
+    Write-behind buffer for reading progress. Posts only replace the latest
+    position per book in memory; a background task writes all changed books
+    in one upsert every ``progress_flush_interval`` seconds and on shutdown.
+
+    Reads must go through ``get`` first: a position is visible there from the
+    moment it is recorded until its flush has committed.
+    """
+
+    def __init__(self) -> None:
+        self.interval = settings.progress_flush_interval
+        self._pending: Dict[str, Position] = {}
+        self._flushing: Dict[str, Position] = {}
+        self._lock = threading.Lock()
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._flush_lock = asyncio.Lock()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        await self.flush()
+
+    def record(self, book_id: str, chapter_id: Optional[str], paragraph_index: Optional[int]) -> None:
+        with self._lock:
+            self._pending[book_id] = (chapter_id, paragraph_index)
+
+    def get(self, book_id: str) -> Optional[Position]:
+        """The buffered position for a book, or None if the database is up to date."""
+        with self._lock:
+            return self._pending.get(book_id) or self._flushing.get(book_id)
+
+    async def flush(self) -> int:
+        """Write every buffered position in a single upsert; returns the number of books written."""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                self._flushing, self._pending = self._pending, {}
+                batch = dict(self._flushing)
+            try:
+                await self._write(batch)
+            except Exception:
+                logger.exception("Failed to flush reading progress for %d books", len(batch))
+                with self._lock:
+                    # Keep anything not superseded by a newer post for the next flush
+                    for book_id, position in batch.items():
+                        self._pending.setdefault(book_id, position)
+                    self._flushing = {}
+                return 0
+            with self._lock:
+                self._flushing = {}
+            return len(batch)
+
+    async def _write(self, batch: Dict[str, Position]) -> None:
+        now = datetime.utcnow()
+        rows = [
+            {"book_id": book_id, "chapter_id": chapter_id, "paragraph_index": paragraph_index, "updated_at": now}
+            for book_id, (chapter_id, paragraph_index) in batch.items()
+        ]
+        statement = insert(Progress)
+        statement = statement.on_conflict_do_update(
+            index_elements=[Progress.book_id],
+            set_={
+                "chapter_id": statement.excluded.chapter_id,
+                "paragraph_index": statement.excluded.paragraph_index,
+                "updated_at": statement.excluded.updated_at,
+            },
+        )
+        async with get_async_session() as session:
+            await session.execute(statement, rows)
+            await session.commit()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Progress flush loop error")
+
+
+progress_buffer = ProgressBuffer()
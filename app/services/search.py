@@ -0,0 +1,137 @@
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from ..models import Book
+from .storage import storage_service
+
+TOKEN_RE = re.compile(r"\w+\*?", re.UNICODE)
+SNIPPET_OPEN = "<mark>"
+SNIPPET_CLOSE = "</mark>"
+INSERT_BATCH_SIZE = 1000
+
+CREATE_FTS_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS paragraph_fts USING fts5(
+    text,
+    book_id UNINDEXED,
+    chapter_id UNINDEXED,
+    paragraph_index UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+)
+"""
+
+
+def build_match_query(query: str) -> str:
+    """
+    Turn free text into a safe FTS5 query: every word becomes a quoted term
+    (implicitly ANDed); a trailing ``*`` keeps prefix matching.
+    """
+    terms = []
+    for token in TOKEN_RE.findall(query):
+        prefix = token.endswith("*")
+        word = token.rstrip("*")
+        if word:
+            terms.append(f'"{word}"*' if prefix else f'"{word}"')
+    return " ".join(terms)
+
+
+class SearchService:
+    """Full-text search over book paragraphs, backed by an FTS5 table in the app database."""
+
+    def create_index(self, conn: Connection) -> None:
+        conn.execute(text(CREATE_FTS_SQL))
+
+    def index_book(self, session: Session, book_id: str) -> int:
+        """
+        (Re)index every paragraph of a stored book in a single transaction,
+        inserting in batches. Returns the number of paragraphs indexed.
+        """
+        session.execute(text("DELETE FROM paragraph_fts WHERE book_id = :book_id"), {"book_id": book_id})
+        count = 0
+        batch: List[Dict[str, Any]] = []
+        for row in self._iter_rows(book_id):
+            batch.append(row)
+            if len(batch) >= INSERT_BATCH_SIZE:
+                count += self._insert(session, batch)
+                batch = []
+        if batch:
+            count += self._insert(session, batch)
+
+        book = session.get(Book, book_id)
+        if book is not None:
+            book.indexed_at = datetime.utcnow()
+        session.commit()
+        return count
+
+    def _iter_rows(self, book_id: str) -> Iterator[Dict[str, Any]]:
+        toc = storage_service.load_toc(book_id)
+        with storage_service.open_store(book_id) as store:
+            for chapter_index, entry in enumerate(toc["chapters"]):
+                for offset, paragraph in enumerate(store.chapter_paragraphs(chapter_index)):
+                    yield {
+                        "text": paragraph,
+                        "book_id": book_id,
+                        "chapter_id": entry["chapter_id"],
+                        "paragraph_index": offset,
+                    }
+
+    def _insert(self, session: Session, rows: List[Dict[str, Any]]) -> int:
+        session.execute(
+            text(
+                "INSERT INTO paragraph_fts (text, book_id, chapter_id, paragraph_index) "
+                "VALUES (:text, :book_id, :chapter_id, :paragraph_index)"
+            ),
+            rows,
+        )
+        return len(rows)
+
+    def search(
+        self,
+        session: Session,
+        query: str,
+        *,
+        book_id: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """Ranked hits (best first) with highlighted snippets and chapter/paragraph locations."""
+        match = build_match_query(query)
+        if not match:
+            return []
+        params: Dict[str, Any] = {
+            "match": match,
+            "open": SNIPPET_OPEN,
+            "close": SNIPPET_CLOSE,
+            "limit": limit,
+            "offset": offset,
+        }
+        book_filter = ""
+        if book_id is not None:
+            book_filter = "AND paragraph_fts.book_id = :book_id"
+            params["book_id"] = book_id
+        result = session.execute(
+            text(
+                f"""
+                SELECT paragraph_fts.book_id AS book_id,
+                       books.title AS book_title,
+                       paragraph_fts.chapter_id AS chapter_id,
+                       paragraph_fts.paragraph_index AS paragraph_index,
+                       snippet(paragraph_fts, 0, :open, :close, '…', 16) AS snippet,
+                       bm25(paragraph_fts) AS rank
+                FROM paragraph_fts
+                JOIN books ON books.id = paragraph_fts.book_id
+                WHERE paragraph_fts MATCH :match {book_filter}
+                ORDER BY rank
+                LIMIT :limit OFFSET :offset
+                """
+            ),
+            params,
+        )
+        return [dict(row._mapping) for row in result]
+
+
+search_service = SearchService()
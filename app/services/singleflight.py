@@ -0,0 +1,164 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional, TypeVar
+
+try:
+    import fcntl
+except ImportError:  # not POSIX: only in-process deduplication
+    fcntl = None
+
+from ..config import settings
+
+T = TypeVar("T")
+
+LOCK_POLL_INITIAL = 0.02
+LOCK_POLL_MAX = 0.5
+
+
+class FileLock:
+    """
+    Exclusive advisory lock on ``cache_path/locks/<namespace>/<key>.lock``,
+    shared by every process on the host. The lock file is removed on release;
+    an acquirer that ends up holding a file that was already unlinked retries.
+    """
+
+    def __init__(self, namespace: str, key: str) -> None:
+        self.path = Path(settings.cache_path) / "locks" / namespace / f"{key}.lock"
+        self._fd: Optional[int] = None
+
+    def try_acquire(self) -> bool:
+        if fcntl is None:
+            return True
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        try:
+            current = os.stat(self.path)
+        except FileNotFoundError:
+            current = None
+        if current is None or current.st_ino != os.fstat(fd).st_ino:
+            # The previous holder unlinked this file after we opened it
+            os.close(fd)
+            return self.try_acquire()
+        self._fd = fd
+        return True
+
+    def acquire(self) -> None:
+        """Block until the lock is held (for worker processes)."""
+        delay = LOCK_POLL_INITIAL
+        while not self.try_acquire():
+            time.sleep(delay)
+            delay = min(delay * 2, LOCK_POLL_MAX)
+
+    async def acquire_async(self) -> None:
+        """Poll without blocking the event loop; cancellation never leaves the lock held."""
+        delay = LOCK_POLL_INITIAL
+        while not self.try_acquire():
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, LOCK_POLL_MAX)
+
+    def release(self) -> None:
+        fd, self._fd = self._fd, None
+        if fd is None:
+            return
+        try:
+            self.path.unlink(missing_ok=True)
+        finally:
+            os.close(fd)  # closing drops the flock
+
+
+@contextmanager
+def file_lock(namespace: str, key: str) -> Iterator[None]:
+    lock = FileLock(namespace, key)
+    lock.acquire()
+    try:
+        yield
+    finally:
+        lock.release()
+
+
+@asynccontextmanager
+async def async_file_lock(namespace: str, key: str) -> AsyncIterator[None]:
+    lock = FileLock(namespace, key)
+    await lock.acquire_async()
+    try:
+        yield
+    finally:
+        lock.release()
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task) -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Runs at most one ``func`` per key at a time across the host.
+
+    Callers in the same process share one task and all get its result (or
+    exception). Cancelling a caller only cancels the shared task once no
+    other caller is waiting for it. The task holds a ``FileLock`` so other
+    processes with the same key wait, then call ``recheck`` first (in a
+    worker thread, as it usually touches disk): if the other process
+    already produced the result, it is returned without running ``func``
+    again.
+    """
+
+    def __init__(self, namespace: str) -> None:
+        self.namespace = namespace
+        self._flights: Dict[str, _Flight] = {}
+
+    async def run(
+        self,
+        key: str,
+        func: Callable[[], Awaitable[T]],
+        recheck: Optional[Callable[[], Optional[T]]] = None,
+    ) -> T:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.create_task(self._lead(key, func, recheck)))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+        flight.waiters += 1
+        try:
+            # Shielded, so one caller going away doesn't cancel the others
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # The last caller was cancelled: nobody wants the result any more
+                self._forget(key, flight)
+                flight.task.cancel()
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    async def _lead(
+        self,
+        key: str,
+        func: Callable[[], Awaitable[T]],
+        recheck: Optional[Callable[[], Optional[T]]],
+    ) -> T:
+        lock = FileLock(self.namespace, key)
+        await lock.acquire_async()
+        try:
+            if recheck is not None:
+                # Another process may have finished this key while we waited
+                result = await asyncio.to_thread(recheck)
+                if result is not None:
+                    return result
+            return await func()
+        finally:
+            lock.release()
@@ -1,16 +1,26 @@
+import hashlib
 import json
+import uuid
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 import aiofiles
 from fastapi import UploadFile
 
 from ..config import settings
+from .cache import LRUCache
+from .singleflight import file_lock
+from .storage_manager import storage_manager
+from .paragraph_store import BLOB_NAME, INDEX_NAME, ParagraphStore, ParagraphStoreWriter, store_digest
 
 
 class StorageService:
     def __init__(self) -> None:
         self.base_books_dir = settings.storage_root / "books"
+        self.toc_cache = LRUCache(settings.toc_cache_max_entries, name="toc")
+        self.structure_cache = LRUCache(
+            settings.book_cache_max_entries, settings.book_cache_max_bytes, name="book_structure"
+        )
 
     def book_dir(self, book_id: str) -> Path:
         path = self.base_books_dir / book_id
@@ -18,8 +28,12 @@ class StorageService:
         return path
 
     def text_path(self, book_id: str) -> Path:
+        """Legacy single-file layout; only read to migrate older books."""
         return self.book_dir(book_id) / "text.json"
 
+    def toc_path(self, book_id: str) -> Path:
+        return self.book_dir(book_id) / "toc.json"
+
     def uploads_dir(self) -> Path:
         path = settings.storage_root / "uploads"
         path.mkdir(parents=True, exist_ok=True)
@@ -28,29 +42,193 @@ class StorageService:
     def cover_path(self, book_id: str) -> Path:
         return self.book_dir(book_id) / "cover.jpg"
 
-    async def save_upload_file(self, upload_file: UploadFile) -> Path:
-        dest = self.uploads_dir() / upload_file.filename
-        async with aiofiles.open(dest, "wb") as buffer:
-            while True:
-                chunk = await upload_file.read(1024 * 1024)
-                if not chunk:
-                    break
-                await buffer.write(chunk)
-        await upload_file.close()
-        return dest
+    async def save_upload_file(self, upload_file: UploadFile) -> Tuple[Path, str]:
+        """
+        Stream an upload to disk, hashing it as it is written, and move it to
+        a content-addressed path (``uploads/<sha[:2]>/<sha><suffix>``).
+        Returns the stored path and the sha256 hex digest.
+        """
+        uploads_dir = self.uploads_dir()
+        tmp_path = uploads_dir / f".incoming-{uuid.uuid4().hex}"
+        digest = hashlib.sha256()
+        try:
+            async with aiofiles.open(tmp_path, "wb") as buffer:
+                while True:
+                    chunk = await upload_file.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    await buffer.write(chunk)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        finally:
+            await upload_file.close()
+
+        content_hash = digest.hexdigest()
+        suffix = Path(upload_file.filename or "").suffix.lower()
+        dest = uploads_dir / content_hash[:2] / f"{content_hash}{suffix}"
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        # Identical bytes land on the same path, so a concurrent import of the
+        # same file can replace it without either reader seeing a partial file
+        tmp_path.replace(dest)
+        storage_manager.touch(dest)
+        return dest, content_hash
 
     def save_text_json(self, book_id: str, payload: Dict[str, Any]) -> Path:
-        path = self.text_path(book_id)
-        with path.open("w", encoding="utf-8") as f:
-            json.dump(payload, f, ensure_ascii=False, indent=2)
+        """Store an in-memory book structure; see ``save_chapters``."""
+        return self.save_chapters(book_id, payload["title"], payload["chapters"])
+
+    def save_chapters(self, book_id: str, title: str, chapters: Iterable[Dict[str, Any]]) -> Path:
+        """
+        Store a book as a memory-mapped paragraph store (one UTF-8 blob plus
+        a fixed-width offset index) and a small table of contents, consuming
+        ``chapters`` one at a time. Returns the path of the table of contents.
+        """
+        writer = ParagraphStoreWriter(self.book_dir(book_id))
+        toc_chapters: List[Dict[str, Any]] = []
+        try:
+            for chapter in chapters:
+                first = writer.add_chapter(chapter["paragraphs"])
+                toc_chapters.append(
+                    {
+                        "chapter_id": chapter["chapter_id"],
+                        "title": chapter["title"],
+                        "paragraph_count": len(chapter["paragraphs"]),
+                        "first_paragraph": first,
+                    }
+                )
+            writer.close()
+        except BaseException:
+            writer.abort()
+            raise
+        toc = {"book_id": book_id, "title": title, "chapters": toc_chapters}
+        return self._write_toc(book_id, toc, writer.digest)
+
+    def _write_toc(self, book_id: str, toc: Dict[str, Any], store_hash: str) -> Path:
+        # content_hash covers the paragraph store and every TOC field, so it
+        # changes whenever anything a client could see changes (used for ETags)
+        toc.pop("content_hash", None)
+        toc_bytes = json.dumps(toc, ensure_ascii=False, sort_keys=True).encode("utf-8")
+        toc["content_hash"] = hashlib.sha256(store_hash.encode("ascii") + toc_bytes).hexdigest()
+
+        # The TOC is written last: its presence marks the book as complete
+        path = self.toc_path(book_id)
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(toc, f, ensure_ascii=False)
+        tmp_path.replace(path)
         return path
 
-    def load_text_json(self, book_id: str) -> Dict[str, Any]:
-        path = self.text_path(book_id)
-        if not path.exists():
-            raise FileNotFoundError(f"Missing structured text for {book_id}")
+    def _toc_validator(self, book_id: str) -> Optional[Tuple[int, int, int]]:
+        """Stat of toc.json, which is replaced (never edited) every time a book is written."""
+        try:
+            stat = self.toc_path(book_id).stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def load_toc(self, book_id: str) -> Dict[str, Any]:
+        """Table of contents including ``content_hash``; cached until toc.json changes."""
+        validator = self._toc_validator(book_id)
+        if validator is not None:
+            cached = self.toc_cache.get(book_id, validator)
+            if cached is not None:
+                return cached
+
+        if self._needs_migration(book_id):
+            self.migrate_book(book_id)
+        path = self.toc_path(book_id)
         with path.open("r", encoding="utf-8") as f:
-            return json.load(f)
+            toc = json.load(f)
+        if "content_hash" not in toc:
+            self._write_toc(book_id, toc, store_digest(self.book_dir(book_id)))
+        self.toc_cache.put(book_id, self._toc_validator(book_id), toc)
+        return toc
+
+    def open_store(self, book_id: str) -> ParagraphStore:
+        return ParagraphStore(self.book_dir(book_id))
+
+    def load_chapter(
+        self,
+        book_id: str,
+        chapter_id: str,
+        start: int = 0,
+        stop: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Load a chapter, or only paragraphs ``start:stop`` of it."""
+        toc = self.load_toc(book_id)
+        entry = next((c for c in toc["chapters"] if c["chapter_id"] == chapter_id), None)
+        if entry is None:
+            raise KeyError(f"Chapter {chapter_id} not found in {book_id}")
+        count = entry["paragraph_count"]
+        stop = count if stop is None else min(stop, count)
+        first = entry["first_paragraph"]
+        with self.open_store(book_id) as store:
+            paragraphs = store.paragraphs(first + start, first + stop) if start < stop else []
+        return {"chapter_id": entry["chapter_id"], "title": entry["title"], "paragraphs": paragraphs}
+
+    def load_paragraphs(self, book_id: str, start: int, stop: int) -> List[str]:
+        """Load paragraphs by global (book-wide) index, crossing chapter boundaries."""
+        with self.open_store(book_id) as store:
+            return store.paragraphs(start, stop)
+
+    def load_text_json(self, book_id: str) -> Dict[str, Any]:
+        """Full book structure; cached (size-bounded LRU) until toc.json changes."""
+        toc = self.load_toc(book_id)
+        validator = toc["content_hash"]
+        cached = self.structure_cache.get(book_id, validator)
+        if cached is not None:
+            return cached
+
+        with self.open_store(book_id) as store:
+            chapters = [
+                {
+                    "chapter_id": entry["chapter_id"],
+                    "title": entry["title"],
+                    "paragraphs": store.chapter_paragraphs(index),
+                }
+                for index, entry in enumerate(toc["chapters"])
+            ]
+        structure = {"book_id": toc["book_id"], "title": toc["title"], "chapters": chapters}
+        # Rough in-memory footprint: UTF-8 text plus per-string object overhead
+        size = (self.book_dir(book_id) / BLOB_NAME).stat().st_size + 64 * store.paragraph_count
+        self.structure_cache.put(book_id, validator, structure, size)
+        return structure
+
+    def _needs_migration(self, book_id: str) -> bool:
+        return self._toc_validator(book_id) is None or not (self.book_dir(book_id) / INDEX_NAME).exists()
+
+    def migrate_book(self, book_id: str) -> bool:
+        """
+        Convert a legacy ``text.json`` book to the paragraph store. Returns
+        False if another request or worker converted it first.
+        """
+        with file_lock("migrate", book_id):
+            if not self._needs_migration(book_id):
+                return False
+            text_path = self.text_path(book_id)
+            if not text_path.exists():
+                raise FileNotFoundError(f"Missing structured text for {book_id}")
+            with text_path.open("r", encoding="utf-8") as f:
+                payload = json.load(f)
+
+            self.save_text_json(book_id, payload)
+            text_path.unlink(missing_ok=True)
+        return True
+
+    def migrate_all(self) -> int:
+        """Migrate every legacy book under ``base_books_dir``; returns how many were converted."""
+        migrated = 0
+        if not self.base_books_dir.exists():
+            return migrated
+        for book_dir in self.base_books_dir.iterdir():
+            if book_dir.is_dir() and not (book_dir / INDEX_NAME).exists():
+                try:
+                    migrated += self.migrate_book(book_dir.name)
+                except FileNotFoundError:
+                    continue
+        return migrated
 
 
 storage_service = StorageService()
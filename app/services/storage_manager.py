@@ -0,0 +1,292 @@
+import asyncio
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Set
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import get_session
+from ..models import Book, IngestionJob, StoredFile
+from .metrics import STORAGE_BYTES, STORAGE_RECLAIMED_BYTES, STORAGE_RECLAIMED_FILES
+from .singleflight import FileLock
+
+logger = logging.getLogger(__name__)
+
+EVICTION_BATCH_SIZE = 200
+
+
+class Area(NamedTuple):
+    name: str
+    root: Path
+    quota: int  # bytes, 0 = unlimited
+    per_directory: bool  # track each top-level directory as one unit (books)
+
+
+def _areas() -> List[Area]:
+    return [
+        Area("tts", Path(settings.tts_output_path), settings.storage_quota_tts_bytes, False),
+        Area("audio", Path(settings.audio_path), settings.storage_quota_audio_bytes, False),
+        Area("uploads", settings.storage_root / "uploads", settings.storage_quota_uploads_bytes, False),
+        Area("books", settings.storage_root / "books", settings.storage_quota_books_bytes, True),
+    ]
+
+
+def _disk_size(path: Path) -> Optional[int]:
+    """Bytes used by a file or directory tree, or None if it no longer exists."""
+    try:
+        if not path.is_dir():
+            return path.stat().st_size
+    except FileNotFoundError:
+        return None
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.stat(os.path.join(root, name)).st_size
+            except FileNotFoundError:
+                pass
+    return total
+
+
+class StorageManager:
+    """
+    Keeps the storage directories within per-area byte quotas.
+
+    Size and last access of every generated file (per book directory for
+    ``books``) live in the ``stored_files`` table, so quotas are enforced
+    from the database rather than by walking the tree. Accesses are only
+    ``touch``ed in memory and written in batches by the background sweep,
+    which then evicts the least recently used entries of any area over its
+    quota. Nothing a ``Book`` row (or a queued/running import) still
+    references is evicted, nor anything used within ``storage_min_idle_seconds``.
+    """
+
+    def __init__(self) -> None:
+        self.areas = _areas()
+        self._pending: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._scanned = False
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        await run_in_threadpool(self.flush)
+
+    def touch(self, path: Path) -> None:
+        """Record that ``path`` was written or read; cheap enough for request handlers."""
+        with self._lock:
+            self._pending[str(path)] = time.time()
+
+    def flush(self) -> int:
+        """Write buffered accesses (with current sizes) to the database; returns entries written."""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        rows: Dict[str, dict] = {}
+        gone: Set[str] = set()
+        for raw_path, accessed in batch.items():
+            located = self._locate(Path(raw_path))
+            if located is None:
+                continue
+            area, path = located
+            size = _disk_size(path)
+            if size is None:
+                gone.add(str(path))
+                continue
+            rows[str(path)] = {
+                "path": str(path),
+                "area": area.name,
+                "size": size,
+                "last_access": datetime.utcfromtimestamp(accessed),
+            }
+        if not rows and not gone:
+            return 0
+        with get_session() as session:
+            if rows:
+                statement = insert(StoredFile)
+                statement = statement.on_conflict_do_update(
+                    index_elements=[StoredFile.path],
+                    set_={"size": statement.excluded.size, "last_access": statement.excluded.last_access},
+                )
+                session.execute(statement, list(rows.values()))
+            if gone:
+                session.execute(delete(StoredFile).where(StoredFile.path.in_(gone)))
+            session.commit()
+        return len(rows)
+
+    def sweep(self) -> Dict[str, int]:
+        """Flush accesses and evict over-quota areas; returns reclaimed bytes per area."""
+        lock = FileLock("storage", "sweep")
+        if not lock.try_acquire():
+            return {}  # another worker is sweeping
+        try:
+            if not self._scanned:
+                self._scan_untracked()
+                self._scanned = True
+            self.flush()
+            reclaimed = {}
+            with get_session() as session:
+                for area in self.areas:
+                    freed = self._enforce(session, area)
+                    if freed:
+                        reclaimed[area.name] = freed
+            if reclaimed.get("tts"):
+                from .tts import tts_service  # imported here: tts depends on this module
+
+                tts_service.cache.compact()
+            return reclaimed
+        finally:
+            lock.release()
+
+    def _locate(self, path: Path) -> Optional[tuple]:
+        """The area a path belongs to and the unit tracked for it, or None if it is not managed."""
+        for area in self.areas:
+            try:
+                relative = path.relative_to(area.root)
+            except ValueError:
+                continue
+            if not relative.parts or any(part.startswith(".") for part in relative.parts):
+                return None  # the root itself, or an in-progress temp file
+            if area.per_directory:
+                return area, area.root / relative.parts[0]
+            return area, path
+        return None
+
+    def _scan_untracked(self) -> None:
+        """One-time walk of areas with no tracked entries, e.g. files written before tracking existed."""
+        with get_session() as session:
+            tracked = {
+                area for (area,) in session.execute(select(StoredFile.area).group_by(StoredFile.area))
+            }
+        for area in self.areas:
+            if area.name in tracked or not area.root.exists():
+                continue
+            for path in self._walk(area):
+                try:
+                    modified = path.stat().st_mtime
+                except FileNotFoundError:
+                    continue
+                with self._lock:
+                    self._pending.setdefault(str(path), modified)
+
+    def _walk(self, area: Area) -> Iterator[Path]:
+        if area.per_directory:
+            yield from (path for path in area.root.iterdir() if path.is_dir())
+            return
+        for root, dirs, files in os.walk(area.root):
+            dirs[:] = [name for name in dirs if not name.startswith(".")]
+            for name in files:
+                if not name.startswith("."):
+                    yield Path(root) / name
+
+    def _enforce(self, session: Session, area: Area) -> int:
+        used = session.execute(select(func.sum(StoredFile.size)).where(StoredFile.area == area.name)).scalar() or 0
+        if area.quota <= 0 or used <= area.quota:
+            STORAGE_BYTES.set(used, area.name)
+            return 0
+
+        idle_before = datetime.utcnow() - timedelta(seconds=settings.storage_min_idle_seconds)
+        reclaimed = 0
+        last_seen = None
+        while used > area.quota:
+            query = (
+                select(StoredFile.path, StoredFile.size, StoredFile.last_access)
+                .where(StoredFile.area == area.name, StoredFile.last_access < idle_before)
+                .order_by(StoredFile.last_access, StoredFile.path)
+                .limit(EVICTION_BATCH_SIZE)
+            )
+            if last_seen is not None:
+                query = query.where(
+                    (StoredFile.last_access > last_seen[0])
+                    | ((StoredFile.last_access == last_seen[0]) & (StoredFile.path > last_seen[1]))
+                )
+            candidates = session.execute(query).all()
+            if not candidates:
+                break
+            last_seen = (candidates[-1].last_access, candidates[-1].path)
+            protected = self._protected(session, area, [row.path for row in candidates])
+            evicted = []
+            for row in candidates:
+                if used <= area.quota:
+                    break
+                if row.path in protected:
+                    continue
+                if self._remove(area, Path(row.path)):
+                    reclaimed += row.size
+                    STORAGE_RECLAIMED_FILES.inc(area.name)
+                used -= row.size
+                evicted.append(row.path)
+            if evicted:
+                session.execute(delete(StoredFile).where(StoredFile.path.in_(evicted)))
+                session.commit()
+
+        STORAGE_BYTES.set(used, area.name)
+        if reclaimed:
+            STORAGE_RECLAIMED_BYTES.inc(area.name, amount=reclaimed)
+            logger.info("Storage area %s over quota: reclaimed %d bytes, %d bytes in use", area.name, reclaimed, used)
+        elif used > area.quota:
+            logger.warning("Storage area %s is over quota (%d bytes) but nothing can be evicted", area.name, used)
+        return reclaimed
+
+    def _protected(self, session: Session, area: Area, paths: List[str]) -> Set[str]:
+        """Candidates still referenced by a book or by an unfinished import."""
+        active = IngestionJob.status.in_(("queued", "running"))
+        if area.name == "books":
+            ids = [Path(path).name for path in paths]
+            referenced = set(session.execute(select(Book.id).where(Book.id.in_(ids))).scalars())
+            referenced.update(
+                session.execute(select(IngestionJob.book_id).where(IngestionJob.book_id.in_(ids), active)).scalars()
+            )
+            return {path for path in paths if Path(path).name in referenced}
+        protected = set(
+            session.execute(select(Book.content_path).where(Book.content_path.in_(paths))).scalars()
+        )
+        protected.update(session.execute(select(Book.cover_path).where(Book.cover_path.in_(paths))).scalars())
+        if area.name == "uploads":
+            protected.update(
+                session.execute(
+                    select(IngestionJob.upload_path).where(IngestionJob.upload_path.in_(paths), active)
+                ).scalars()
+            )
+        return protected
+
+    def _remove(self, area: Area, path: Path) -> bool:
+        """Delete a tracked file or book directory; False if it was already gone."""
+        try:
+            if area.per_directory:
+                shutil.rmtree(path)
+            else:
+                path.unlink()
+                if area.name == "audio":
+                    path.with_suffix(".json").unlink(missing_ok=True)  # chapter index sidecar
+        except FileNotFoundError:
+            return False
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                reclaimed = await run_in_threadpool(self.sweep)
+                if reclaimed:
+                    logger.info("Storage sweep reclaimed %d bytes", sum(reclaimed.values()))
+            except Exception:
+                logger.exception("Storage sweep failed")
+            await asyncio.sleep(settings.storage_sweep_interval)
+
+
+storage_manager = StorageManager()
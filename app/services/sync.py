@@ -0,0 +1,98 @@
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from ..models import Annotation, Book, Progress, SyncCounter, SyncTombstone
+
+# (table, entity, id column, book id column, columns whose updates clients see)
+SYNCED_TABLES = (
+    ("books", "book", "id", "id", ("title", "author", "filename", "content_path", "cover_path", "extra_metadata")),
+    ("annotations", "annotation", "id", "book_id", ("location", "note")),
+    ("progress", "progress", "book_id", "book_id", ("chapter_id", "paragraph_index")),
+)
+
+NEXT_SEQ_SQL = "UPDATE sync_counter SET value = value + 1 WHERE id = 1;"
+CURRENT_SEQ_SQL = "(SELECT value FROM sync_counter WHERE id = 1)"
+
+
+class SyncService:
+    """
+    Change feed for the desktop client.
+
+    Every insert, client-visible update and delete of a book, annotation or
+    progress row takes the next value of one database-wide counter, assigned
+    by SQLite triggers inside the writing transaction (so bulk upserts and
+    raw SQL are covered too). SQLite has a single writer, so sequence numbers
+    become visible in order: once a reader has seen ``n``, no change ``<= n``
+    can still appear. Deletes leave a row in ``sync_tombstones``.
+    """
+
+    def create_triggers(self, conn: Connection) -> None:
+        """Install the counter and triggers, numbering rows written before they existed."""
+        conn.execute(text("INSERT OR IGNORE INTO sync_counter (id, value) VALUES (1, 0)"))
+        for table, entity, id_column, book_column, columns in SYNCED_TABLES:
+            # rowid keeps backfilled numbers distinct, so cursors never split ties
+            conn.execute(
+                text(f"UPDATE {table} SET change_seq = {CURRENT_SEQ_SQL} + rowid WHERE change_seq IS NULL")
+            )
+            conn.execute(
+                text(
+                    f"UPDATE sync_counter SET value = MAX(value, (SELECT COALESCE(MAX(change_seq), 0) FROM {table})) "
+                    "WHERE id = 1"
+                )
+            )
+            stamp = f"UPDATE {table} SET change_seq = {CURRENT_SEQ_SQL} WHERE rowid = NEW.rowid;"
+            conn.execute(
+                text(
+                    f"CREATE TRIGGER IF NOT EXISTS {table}_sync_insert AFTER INSERT ON {table} "
+                    f"BEGIN {NEXT_SEQ_SQL} {stamp} END"
+                )
+            )
+            conn.execute(
+                text(
+                    f"CREATE TRIGGER IF NOT EXISTS {table}_sync_update AFTER UPDATE OF {', '.join(columns)} "
+                    f"ON {table} BEGIN {NEXT_SEQ_SQL} {stamp} END"
+                )
+            )
+            conn.execute(
+                text(
+                    f"CREATE TRIGGER IF NOT EXISTS {table}_sync_delete AFTER DELETE ON {table} BEGIN {NEXT_SEQ_SQL} "
+                    "INSERT INTO sync_tombstones (change_seq, entity, entity_id, book_id, deleted_at) "
+                    f"VALUES ({CURRENT_SEQ_SQL}, '{entity}', OLD.{id_column}, OLD.{book_column}, CURRENT_TIMESTAMP); END"
+                )
+            )
+
+    def current_seq(self, session: Session) -> int:
+        return session.execute(select(SyncCounter.value).where(SyncCounter.id == 1)).scalar() or 0
+
+    def changes(self, session: Session, since: int, limit: int) -> Dict[str, Any]:
+        """
+        Up to ``limit`` changes after ``since``, oldest first, grouped by kind,
+        with the cursor to pass next time and whether more are waiting.
+        """
+        sources = (
+            ("books", select(Book).where(Book.change_seq > since).order_by(Book.change_seq)),
+            ("annotations", select(Annotation).where(Annotation.change_seq > since).order_by(Annotation.change_seq)),
+            ("progress", select(Progress).where(Progress.change_seq > since).order_by(Progress.change_seq)),
+            (
+                "deleted",
+                select(SyncTombstone).where(SyncTombstone.change_seq > since).order_by(SyncTombstone.change_seq),
+            ),
+        )
+        # The first ``limit`` changes overall are among the first ``limit`` of each kind
+        merged: List[Tuple[int, str, Any]] = []
+        for kind, query in sources:
+            merged.extend((row.change_seq, kind, row) for row in session.execute(query.limit(limit + 1)).scalars())
+        merged.sort(key=lambda item: item[0])
+
+        result: Dict[str, Any] = {"books": [], "annotations": [], "progress": [], "deleted": []}
+        for _, kind, row in merged[:limit]:
+            result[kind].append(row)
+        result["has_more"] = len(merged) > limit
+        result["next_cursor"] = merged[:limit][-1][0] if merged else since
+        return result
+
+
+sync_service = SyncService()
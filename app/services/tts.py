@@ -1,33 +1,324 @@
+import asyncio
+import re
+import time
 import uuid
+from collections import deque
 from pathlib import Path
+from typing import AsyncIterator, Deque, Dict, List, Optional
+
 import httpx
 
 from ..config import settings
+from .audio import read_wav, wav_header
+from .cache import SynthesisCache, normalize_text
+from .metrics import TTS_ERRORS, TTS_IN_FLIGHT, TTS_REQUEST_SECONDS, TTS_WAITING
+from .singleflight import SingleFlight
+
+SENTENCE_RE = re.compile(r"(?<=[.!?\u2026][\"'\u201d\u2019)\]])\s+|(?<=[.!?\u2026])\s+")
+CLAUSE_RE = re.compile(r"(?<=[,;:\u2014])\s+")
+MIN_CHUNK_CHARS = 24
+
+
+def split_sentences(text: str, max_chars: int) -> List[str]:
+    """
+    Split text into sentence-sized chunks for streaming synthesis. Very short
+    sentences are merged with the next one and overlong ones are broken at
+    clause boundaries (or whitespace) so no chunk exceeds ``max_chars``.
+    """
+    pieces: List[str] = []
+    for sentence in SENTENCE_RE.split(normalize_text(text)):
+        while len(sentence) > max_chars:
+            cut = max(
+                (m.start() for m in CLAUSE_RE.finditer(sentence, 0, max_chars)),
+                default=sentence.rfind(" ", 0, max_chars),
+            )
+            if cut <= 0:
+                cut = max_chars
+            pieces.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if sentence:
+            pieces.append(sentence)
+
+    chunks: List[str] = []
+    for piece in pieces:
+        if chunks and len(chunks[-1]) < MIN_CHUNK_CHARS and len(chunks[-1]) + len(piece) < max_chars:
+            chunks[-1] = f"{chunks[-1]} {piece}"
+        else:
+            chunks.append(piece)
+    return chunks
+
+
+class TTSOverloadedError(RuntimeError):
+    """Raised when too many synthesis requests are already waiting for Coqui."""
+
+
+class _SlotWaiter:
+    __slots__ = ("background", "future", "granted_background")
+
+    def __init__(self, background: bool) -> None:
+        self.background = background
+        self.future: Optional[asyncio.Future] = None
+        self.granted_background = False
+
+
+class PrioritySlots:
+    """
+    Coqui request slots shared by interactive and background synthesis.
+
+    Foreground waiters are always served before background ones (prefetch,
+    chapter builds), and background work holds at most ``limit - reserved``
+    slots, so a reader pressing play never queues behind a batch of
+    background synthesis. Only foreground waiters count as queue depth.
+    """
+
+    def __init__(self, limit: int, reserved: int) -> None:
+        self.limit = limit
+        self.background_limit = max(1, limit - reserved)
+        self.in_use = 0
+        self.background_in_use = 0
+        self._foreground: Deque[_SlotWaiter] = deque()
+        self._background: Deque[_SlotWaiter] = deque()
+
+    def locked(self) -> bool:
+        return self.in_use >= self.limit
+
+    @property
+    def foreground_waiting(self) -> int:
+        return len(self._foreground)
+
+    async def acquire(self, waiter: _SlotWaiter) -> None:
+        if self._can_grant(waiter.background) and not self._foreground and not (
+            waiter.background and self._background
+        ):
+            self._grant(waiter)
+            return
+        waiter.future = asyncio.get_running_loop().create_future()
+        (self._background if waiter.background else self._foreground).append(waiter)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release(waiter)  # granted just as we were cancelled
+            else:
+                self._discard(waiter)
+            raise
+
+    def release(self, waiter: _SlotWaiter) -> None:
+        self.in_use -= 1
+        if waiter.granted_background:
+            self.background_in_use -= 1
+        self._wake()
+
+    def promote(self, waiter: Optional[_SlotWaiter]) -> None:
+        """A foreground caller now wants what ``waiter`` is queued for."""
+        if waiter is None or not waiter.background:
+            return
+        waiter.background = False
+        if waiter in self._background:
+            self._background.remove(waiter)
+            self._foreground.append(waiter)
+            self._wake()
+
+    def _can_grant(self, background: bool) -> bool:
+        if self.in_use >= self.limit:
+            return False
+        return not background or self.background_in_use < self.background_limit
+
+    def _grant(self, waiter: _SlotWaiter) -> None:
+        self.in_use += 1
+        waiter.granted_background = waiter.background
+        if waiter.background:
+            self.background_in_use += 1
+
+    def _wake(self) -> None:
+        for queue in (self._foreground, self._background):
+            while queue and self._can_grant(queue is self._background):
+                waiter = queue.popleft()
+                if waiter.future.done():  # cancelled while queued
+                    continue
+                self._grant(waiter)
+                waiter.future.set_result(None)
+
+    def _discard(self, waiter: _SlotWaiter) -> None:
+        for queue in (self._foreground, self._background):
+            if waiter in queue:
+                queue.remove(waiter)
 
 
 class TTSService:
     def __init__(self):
-        self.tts_url = "http://tts:5002/api/tts"  # docker service name
+        self.tts_url = settings.tts_api_url  # docker service name by default
         self.output_dir = Path(settings.tts_output_path)
-        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.cache = SynthesisCache(settings.cache_path / "tts_index.jsonl", self.output_dir)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._slots = PrioritySlots(settings.tts_max_concurrency, settings.tts_foreground_reserved_slots)
+        self._flight = SingleFlight("tts")
+        # Keys an interactive caller is waiting for, and slot waiters queued per key
+        self._foreground_keys: Dict[str, int] = {}
+        self._queued: Dict[str, _SlotWaiter] = {}
+
+    async def start(self) -> None:
+        if self._client is None:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            limits = httpx.Limits(
+                max_connections=settings.tts_max_connections,
+                max_keepalive_connections=settings.tts_max_connections,
+            )
+            self._client = httpx.AsyncClient(timeout=settings.tts_timeout, limits=limits)
+
+    async def close(self) -> None:
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
+
+    def is_overloaded(self) -> bool:
+        return self._slots.locked() and self._slots.foreground_waiting >= settings.tts_max_queue_depth
+
+    def voice_settings(self) -> Dict[str, Optional[str]]:
+        return {
+            "model": settings.tts_model_name,
+            "speaker_id": settings.tts_speaker_id,
+            "language_id": settings.tts_language_id,
+        }
 
-    async def synthesize(self, text: str):
+    async def synthesize(self, text: str, *, background: bool = False):
         """
         Sends text to the Coqui-TTS Docker microservice and returns
         the path to the generated WAV file.
+
+        Identical (normalized) text with the same voice settings is served
+        from the synthesis cache without calling the TTS service, and
+        concurrent requests for it (from any worker) share one synthesis.
+        ``background`` work (prefetch, chapter builds) yields Coqui slots to
+        interactive requests and is never rejected as overloaded.
         """
 
+        text = normalize_text(text)
+        if not text:
+            raise ValueError("Text is empty")
+
+        voice = self.voice_settings()
+        key = self.cache.key_for(text, voice)
+        cached = self.cache.get(key)
+        if cached:
+            return str(cached)
+
+        def recheck() -> Optional[str]:
+            path = self.cache.get(key)
+            return str(path) if path else None
+
+        if background:
+            return await self._flight.run(key, lambda: self._synthesize_uncached(key, text, voice), recheck)
+        self._foreground_keys[key] = self._foreground_keys.get(key, 0) + 1
+        self._slots.promote(self._queued.get(key))  # e.g. a queued prefetch of this very text
+        try:
+            return await self._flight.run(key, lambda: self._synthesize_uncached(key, text, voice), recheck)
+        finally:
+            self._foreground_keys[key] -= 1
+            if not self._foreground_keys[key]:
+                del self._foreground_keys[key]
+
+    async def _synthesize_uncached(self, key: str, text: str, voice: Dict[str, Optional[str]]) -> str:
         params = {"text": text}
+        if voice["speaker_id"]:
+            params["speaker_id"] = voice["speaker_id"]
+        if voice["language_id"]:
+            params["language_id"] = voice["language_id"]
 
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            response = await client.get(self.tts_url, params=params)
-            response.raise_for_status()
+        audio = await self._request(params, key)
 
-        # Save WAV data
-        output_path = self.output_dir / f"tts_{uuid.uuid4()}.wav"
-        output_path.write_bytes(response.content)
+        # Save WAV data; write-then-rename so readers never see a partial file
+        output_path = self.cache.audio_path(key)
+        tmp_path = output_path.with_name(f".{output_path.name}.{uuid.uuid4().hex}")
+        tmp_path.write_bytes(audio)
+        tmp_path.replace(output_path)
+        self.cache.put(key, output_path, chars=len(text))
 
         return str(output_path)
 
+    async def _request(self, params: Dict[str, str], key: str) -> bytes:
+        waiter = _SlotWaiter(background=key not in self._foreground_keys)
+        if not waiter.background and self.is_overloaded():
+            TTS_ERRORS.inc("overloaded")
+            raise TTSOverloadedError("TTS service is overloaded, try again shortly")
+        await self.start()
+
+        for attempt in range(settings.tts_max_retries + 1):
+            last_attempt = attempt == settings.tts_max_retries
+            await self._acquire_slot(waiter, key)
+            TTS_IN_FLIGHT.inc()
+            started = time.perf_counter()
+            try:
+                response = await self._client.get(self.tts_url, params=params)
+            except httpx.ReadTimeout:
+                self._record_failure(started, "timeout")
+                raise  # Coqui is busy synthesizing; retrying would only add load
+            except httpx.TransportError:
+                self._record_failure(started, "transport")
+                if last_attempt:
+                    raise
+            else:
+                if response.is_success:
+                    TTS_REQUEST_SECONDS.observe(time.perf_counter() - started, "ok")
+                else:
+                    self._record_failure(started, f"http_{response.status_code // 100}xx")
+                if response.status_code < 500 or last_attempt:
+                    response.raise_for_status()
+                    return response.content
+            finally:
+                TTS_IN_FLIGHT.dec()
+                self._slots.release(waiter)
+            # Back off without a slot, so queued requests don't wait on a failing one
+            await asyncio.sleep(settings.tts_retry_backoff * 2**attempt)
+
+    async def _acquire_slot(self, waiter: _SlotWaiter, key: str) -> None:
+        # A foreground caller may have asked for this key while a retry was backing off
+        waiter.background = waiter.background and key not in self._foreground_keys
+        self._queued[key] = waiter
+        TTS_WAITING.inc()
+        try:
+            await self._slots.acquire(waiter)
+        finally:
+            self._queued.pop(key, None)
+            TTS_WAITING.dec()
+
+    def _record_failure(self, started: float, reason: str) -> None:
+        TTS_REQUEST_SECONDS.observe(time.perf_counter() - started, "error")
+        TTS_ERRORS.inc(reason)
+
+    def stream(self, text: str) -> AsyncIterator[bytes]:
+        """
+        Returns an async iterator of WAV bytes for ``text``: a streaming
+        header followed by each sentence's PCM frames in order, emitted as
+        soon as that sentence (and every one before it) is synthesized.
+        """
+        chunks = split_sentences(text, settings.tts_stream_max_chunk_chars)
+        if not chunks:
+            raise ValueError("Text is empty")
+        return self._stream_chunks(chunks)
+
+    async def _stream_chunks(self, chunks: List[str]) -> AsyncIterator[bytes]:
+        semaphore = asyncio.Semaphore(settings.tts_stream_concurrency)
+
+        async def run(chunk: str) -> str:
+            async with semaphore:
+                return await self.synthesize(chunk)
+
+        tasks = [asyncio.create_task(run(chunk)) for chunk in chunks]
+        try:
+            stream_format = None
+            for task in tasks:
+                fmt, frames = await asyncio.to_thread(read_wav, Path(await task))
+                if stream_format is None:
+                    stream_format = fmt
+                    yield wav_header(fmt)
+                elif fmt != stream_format:
+                    raise ValueError(f"TTS returned mixed audio formats: {stream_format} vs {fmt}")
+                yield frames
+        finally:
+            # Client went away or a chunk failed: don't keep synthesizing the rest
+            for task in tasks:
+                task.cancel()
+
 
 tts_service = TTSService()
@@ -0,0 +1,112 @@
+"""
+EPUB extraction benchmark: the old ebooklib + BeautifulSoup(html.parser) path
+against the spine-based extractor with BeautifulSoup, lxml, and lxml across
+worker processes. Chapters mix loose text with nested blocks, and the report
+records whether the lxml and BeautifulSoup paths extracted the same text.
+
+    python -m benchmarks.bench_epub --chapters 400 --paragraphs 60 --workers 4
+
+Prints one JSON object with seconds per path and speedups over the old path.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from app.config import settings
+from app.services import ingestion
+from app.services.ingestion import DocumentIngestionService
+from benchmarks.common import write_epub
+
+
+def old_path(path: Path) -> int:
+    """The original extractor: every item loaded through ebooklib, each parsed with html.parser."""
+    import ebooklib
+    from bs4 import BeautifulSoup
+    from ebooklib import epub
+
+    book = epub.read_epub(str(path))
+    texts = []
+    for item in book.get_items():
+        if item.get_type() == ebooklib.ITEM_DOCUMENT:
+            soup = BeautifulSoup(item.get_content(), "html.parser")
+            texts.append(soup.get_text(separator="\n"))
+    service = DocumentIngestionService()
+    return sum(len(chapter["paragraphs"]) for chapter in service._build_chapters(service._split_paragraphs(texts)))
+
+
+def new_path(path: Path, service: DocumentIngestionService) -> int:
+    return sum(len(chapter["paragraphs"]) for chapter in service.iter_chapters(path))
+
+
+def extracted_text(path: Path, service: DocumentIngestionService) -> str:
+    """All extracted text with whitespace removed; paths may place paragraph breaks differently."""
+    return "".join(
+        "".join(paragraph.split()) for chapter in service.iter_chapters(path) for paragraph in chapter["paragraphs"]
+    )
+
+
+def timed(func, *args, repeat: int):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chapters", type=int, default=400)
+    parser.add_argument("--paragraphs", type=int, default=60)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.epub"
+        write_epub(path, args.chapters, args.paragraphs, mixed=True)
+        report = {
+            "chapters": args.chapters,
+            "paragraphs_per_chapter": args.paragraphs,
+            "epub_bytes": path.stat().st_size,
+            "workers": args.workers,
+            "seconds": {},
+        }
+
+        try:
+            report["seconds"]["ebooklib_bs4"], _ = timed(old_path, path, repeat=args.repeat)
+        except ImportError:
+            report["seconds"]["ebooklib_bs4"] = None
+
+        service = DocumentIngestionService()
+        settings.epub_parallel_min_documents = args.chapters + 1  # in-process
+        lxml_loader = ingestion._lxml_html
+        ingestion._lxml_html = lambda: None
+        report["seconds"]["spine_bs4"], _ = timed(new_path, path, service, repeat=args.repeat)
+        bs4_text = extracted_text(path, service)
+        ingestion._lxml_html = lxml_loader
+        if lxml_loader() is not None:
+            report["lxml_text_matches_bs4"] = extracted_text(path, service) == bs4_text
+            report["seconds"]["spine_lxml"], count = timed(new_path, path, service, repeat=args.repeat)
+            settings.extract_workers = args.workers
+            settings.ingestion_workers = 1  # one import gets the whole budget
+            settings.epub_parallel_min_documents = 0
+            # Includes starting the per-extraction pool
+            report["seconds"]["spine_lxml_parallel"], _ = timed(new_path, path, service, repeat=args.repeat)
+            report["paragraphs"] = count
+
+        baseline = report["seconds"]["ebooklib_bs4"]
+        if baseline:
+            report["speedup"] = {
+                name: round(baseline / seconds, 2)
+                for name, seconds in report["seconds"].items()
+                if seconds and name != "ebooklib_bs4"
+            }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
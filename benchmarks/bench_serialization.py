@@ -0,0 +1,105 @@
+"""
+GET /books/{id} serialization benchmark: the previous path (BookStructure
+models, response_model validation and jsonable_encoder) against orjson
+bytes cached per ETag, uncompressed and gzip/brotli-compressed.
+
+    python -m benchmarks.bench_serialization --sizes 2000,20000 --requests 50
+
+Prints one JSON object with p50/p95/p99 latency and body size per path.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+from benchmarks.common import environment, parse_list, percentiles
+from benchmarks.run import _create_book, configure_environment
+
+
+def legacy_route(app) -> None:
+    """The handler as it was before the fast path, mounted next to the real one."""
+    from app.database import get_session
+    from app.schemas import BookDetailResponse, BookStructure
+    from app.services.books import book_service
+    from app.services.storage import storage_service
+    from app.api.utils import serialize_book
+
+    @app.get("/bench/legacy/books/{book_id}", response_model=BookDetailResponse)
+    def get_book_legacy(book_id: str):
+        with get_session() as session:
+            book = book_service.get_book(session, book_id)
+        structure = storage_service.load_text_json(book_id)
+        return BookDetailResponse(book=serialize_book(book), structure=BookStructure(**structure))
+
+
+async def measure(client, url: str, requests: int, headers: Dict[str, str], before=None) -> Dict[str, Any]:
+    samples, size = [], 0
+    for _ in range(requests + 1):  # the first request warms caches and is dropped
+        if before is not None:
+            before()
+        started = time.perf_counter()
+        response = await client.get(url, headers=headers)
+        samples.append(time.perf_counter() - started)
+        response.raise_for_status()
+        size = int(response.headers["content-length"])
+    return {"body_bytes": size, **percentiles(samples[1:])}
+
+
+async def run(root: Path, sizes, requests: int) -> Dict[str, Any]:
+    import httpx
+
+    from app.api import utils
+    from app.main import app, init_storage
+
+    init_storage()
+    legacy_route(app)
+    transport = httpx.ASGITransport(app=app)
+    results = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for size in sizes:
+            book_id = _create_book(root, int(size))
+            url = f"/api/books/{book_id}"
+            identity = {"Accept-Encoding": "identity"}
+            entry = {
+                "paragraphs": int(size),
+                "legacy": await measure(client, f"/bench/legacy/books/{book_id}", requests, identity),
+                # Cache dropped before every request: serialization cost on each new ETag
+                "orjson_uncached": await measure(client, url, requests, identity, utils.encoded_responses.clear),
+                "orjson_cached": await measure(client, url, requests, identity),
+                "gzip_cached": await measure(client, url, requests, {"Accept-Encoding": "gzip"}),
+            }
+            if utils.brotli is not None:
+                entry["br_cached"] = await measure(client, url, requests, {"Accept-Encoding": "br"})
+            base = entry["legacy"]["p50_ms"]
+            entry["speedup_p50"] = {
+                name: base / value["p50_ms"] for name, value in entry.items() if isinstance(value, dict)
+            }
+            results.append(entry)
+            print(f"book {size}: legacy p50 {base:.1f}ms", file=sys.stderr)
+    return {"requests": requests, "results": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="2000,20000", help="paragraphs per book")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        configure_environment(root, "http://127.0.0.1:9/api/tts")
+        report = {"environment": environment(), **asyncio.run(run(root, parse_list(args.sizes), args.requests))}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
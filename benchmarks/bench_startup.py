@@ -0,0 +1,110 @@
+"""
+Cold-start benchmark: how long a fresh interpreter takes to import the app
+and run its startup (lifespan), and the resident memory at each point. Each
+trial is a new process so nothing is already imported or cached.
+
+    python -m benchmarks.bench_startup --trials 10 --output startup.json
+
+Also reports which document parser libraries were loaded; none should be
+until a document of that format is ingested.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List
+
+from benchmarks.common import environment, percentiles
+
+PARSER_MODULES = ("fitz", "pymupdf", "pdfplumber", "bs4", "lxml", "ebooklib", "docx2txt")
+
+TRIAL = r"""
+import asyncio, json, os, sys, time
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+result = {"baseline_rss_mb": rss_mb()}
+started = time.perf_counter()
+from app.main import app
+result["import_s"] = time.perf_counter() - started
+result["import_rss_mb"] = rss_mb()
+
+async def startup():
+    async with app.router.lifespan_context(app):
+        result["startup_s"] = time.perf_counter() - started
+        result["startup_rss_mb"] = rss_mb()
+
+asyncio.run(startup())
+result["parsers_loaded"] = [name for name in PARSERS if name in sys.modules]
+print(json.dumps(result))
+"""
+
+
+def run_trial(root: Path, number: int) -> Dict[str, Any]:
+    storage = root / f"trial-{number}"
+    env = {
+        "DB_URL": f"sqlite:///{storage / 'startup.db'}",
+        "STORAGE_ROOT": str(storage),
+        "BOOKS_PATH": str(storage / "books"),
+        "AUDIO_PATH": str(storage / "audio"),
+        "CACHE_PATH": str(storage / "cache"),
+        "TTS_OUTPUT_PATH": str(storage / "tts_output"),
+        "INGESTION_WORKERS": "1",
+    }
+    storage.mkdir(parents=True)
+    code = f"PARSERS = {PARSER_MODULES!r}\n" + TRIAL
+    completed = subprocess.run(
+        [sys.executable, "-c", code],
+        env={**_inherited_env(), **env},
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(__file__).resolve().parent.parent,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def _inherited_env() -> Dict[str, str]:
+    return {key: value for key, value in os.environ.items() if key in ("PATH", "HOME", "PYTHONPATH", "LANG")}
+
+
+def summarize(trials: List[Dict[str, Any]], key: str) -> Dict[str, float]:
+    values = [trial[key] for trial in trials]
+    if key.endswith("_s"):
+        return percentiles(values)
+    ordered = sorted(values)
+    return {"min_mb": ordered[0], "median_mb": ordered[len(ordered) // 2], "max_mb": ordered[-1]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trials", type=int, default=10)
+    parser.add_argument("--output", type=Path, help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="readme-startup-") as tmp:
+        trials = [run_trial(Path(tmp), number) for number in range(args.trials)]
+    report = {
+        "environment": environment(),
+        "trials": args.trials,
+        **{key: summarize(trials, key) for key in ("import_s", "startup_s", "import_rss_mb", "startup_rss_mb")},
+        "parsers_loaded": sorted({name for trial in trials for name in trial["parsers_loaded"]}),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
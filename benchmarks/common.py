@@ -0,0 +1,144 @@
+"""Shared helpers for the benchmarks: synthetic books and latency statistics."""
+import math
+import os
+import platform
+import subprocess
+import zipfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+WORDS = "the quick brown fox jumps over a lazy dog while reading long novels aloud".split()
+WORD_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+
+def paragraph_text(number: int, words: int = 40) -> str:
+    return " ".join(WORDS[(number + j) % len(WORDS)] for j in range(words)) + f" {number}."
+
+
+def write_txt(path: Path, paragraphs: int) -> None:
+    with path.open("w", encoding="utf-8") as f:
+        for number in range(paragraphs):
+            f.write(paragraph_text(number) + "\n\n")
+
+
+def write_docx(path: Path, paragraphs: int) -> None:
+    body = "".join(f"<w:p><w:r><w:t>{paragraph_text(number)}</w:t></w:r></w:p>" for number in range(paragraphs))
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(
+            "[Content_Types].xml",
+            '<?xml version="1.0"?><Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Override PartName="/word/document.xml" ContentType="application/'
+            'vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/></Types>',
+        )
+        archive.writestr(
+            "word/document.xml",
+            f'<?xml version="1.0"?><w:document xmlns:w="{WORD_NS}"><w:body>{body}</w:body></w:document>',
+        )
+
+
+def write_epub(path: Path, chapters: int, paragraphs_per_chapter: int, mixed: bool = False) -> None:
+    """``mixed`` adds text that sits directly in containers next to nested blocks, as real EPUBs often do."""
+    manifest, spine = [], []
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("mimetype", "application/epub+zip", compress_type=zipfile.ZIP_STORED)
+        archive.writestr(
+            "META-INF/container.xml",
+            '<?xml version="1.0"?><container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">'
+            '<rootfiles><rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>'
+            "</rootfiles></container>",
+        )
+        for number in range(1, chapters + 1):
+            first = (number - 1) * paragraphs_per_chapter
+            body = "".join(f"<p>{paragraph_text(first + i)}</p>" for i in range(paragraphs_per_chapter))
+            if mixed:
+                body = (
+                    f"Opening of chapter {number}.{body}"
+                    f"<blockquote>Quoted intro<p>{paragraph_text(first)}</p>closing words</blockquote>"
+                    f"Loose text after the quote.<section><span>Only inline text</span><div>x</div></section>"
+                )
+            archive.writestr(
+                f"OEBPS/ch{number}.xhtml",
+                '<?xml version="1.0" encoding="utf-8"?><html xmlns="http://www.w3.org/1999/xhtml">'
+                f"<head><title>Chapter {number}</title></head><body><div><h1>Chapter {number}</h1>{body}</div>"
+                "</body></html>",
+            )
+            manifest.append(f'<item id="ch{number}" href="ch{number}.xhtml" media-type="application/xhtml+xml"/>')
+            spine.append(f'<itemref idref="ch{number}"/>')
+        archive.writestr(
+            "OEBPS/content.opf",
+            '<?xml version="1.0"?><package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="id">'
+            '<metadata xmlns:dc="http://purl.org/dc/elements/1.1/"><dc:identifier id="id">bench</dc:identifier>'
+            "<dc:title>Bench</dc:title><dc:language>en</dc:language></metadata>"
+            f"<manifest>{''.join(manifest)}</manifest><spine>{''.join(spine)}</spine></package>",
+        )
+
+
+def write_pdf(path: Path, paragraphs: int, lines_per_page: int = 24) -> None:
+    import fitz
+
+    doc = fitz.open()
+    for start in range(0, paragraphs, lines_per_page):
+        page = doc.new_page()
+        y = 40
+        for number in range(start, min(start + lines_per_page, paragraphs)):
+            # One short line per paragraph; PyMuPDF keeps each insert as its own text line
+            page.insert_text((40, y), paragraph_text(number, words=10), fontsize=9)
+            y += 30
+    doc.save(str(path))
+    doc.close()
+
+
+def write_book(path: Path, fmt: str, paragraphs: int) -> Path:
+    path = path.with_suffix(f".{fmt}")
+    if fmt == "txt":
+        write_txt(path, paragraphs)
+    elif fmt == "docx":
+        write_docx(path, paragraphs)
+    elif fmt == "epub":
+        per_chapter = 50
+        write_epub(path, max(1, math.ceil(paragraphs / per_chapter)), per_chapter)
+    elif fmt == "pdf":
+        write_pdf(path, paragraphs)
+    else:
+        raise ValueError(f"Unknown format: {fmt}")
+    return path
+
+
+def percentiles(samples: Sequence[float]) -> Dict[str, float]:
+    """Summary of latency samples (seconds) in milliseconds, nearest-rank percentiles."""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def rank(p: float) -> float:
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean_ms": sum(ordered) / len(ordered) * 1000,
+        "p50_ms": rank(50),
+        "p95_ms": rank(95),
+        "p99_ms": rank(99),
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_revision": revision,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def parse_list(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
@@ -0,0 +1,97 @@
+"""
+Local stand-in for the Coqui TTS container (``GET /api/tts?text=...``). It
+answers with a silent 16-bit mono WAV whose length grows with the text, after
+a configurable delay, so the backend can be benchmarked without a GPU.
+
+    python -m benchmarks.fake_tts --port 5002 --latency 0.5
+"""
+import argparse
+import io
+import threading
+import time
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+FRAME_RATE = 22050
+SECONDS_PER_CHAR = 0.06
+
+
+def synthetic_wav(text: str) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(FRAME_RATE)
+        wav.writeframes(b"\0\0" * int(len(text) * SECONDS_PER_CHAR * FRAME_RATE))
+    return buffer.getvalue()
+
+
+class FakeTTSServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, latency: float = 0.0, host: str = "127.0.0.1") -> None:
+        super().__init__((host, port), FakeTTSHandler)
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/api/tts"
+
+    def start(self) -> "FakeTTSServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+class FakeTTSHandler(BaseHTTPRequestHandler):
+    server: FakeTTSServer
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        if url.path != "/api/tts":
+            self.send_error(404)
+            return
+        text = parse_qs(url.query).get("text", [""])[0]
+        if not text:
+            self.send_error(400, "text is required")
+            return
+        with self.server._lock:
+            self.server.requests += 1
+        time.sleep(self.server.latency)
+        body = synthetic_wav(text)
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/wav")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:  # keep benchmark output clean
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5002)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per request")
+    args = parser.parse_args()
+    server = FakeTTSServer(args.port, args.latency, args.host)
+    print(f"Fake TTS listening on {server.url} (latency {args.latency}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""
+Benchmark suite. Generates synthetic books, runs the backend in-process
+against a throwaway database and storage directory, and prints one JSON
+document (or writes it with --output) so runs can be diffed.
+
+    python -m benchmarks.run --sizes 200,2000,20000 --output results.json
+    python -m benchmarks.run --only tts --tts-latency 0.5 --tts-requests 64
+
+Sections:
+  ingest    DocumentIngestionService.ingest / ingest_to_storage per format and
+            size: seconds, paragraphs/s, MB/s, peak RSS and traced Python heap.
+            Each case runs in a fresh process so peaks don't bleed together.
+  reads     GET /books/{id}, /toc and /chapters/{id} latency (p50/p95/p99).
+  progress  POST /books/{id}/progress throughput, sequential and concurrent,
+            and the time to flush the write-behind buffer.
+  tts       POST /api/tts fan-out against a local fake Coqui server with
+            configurable latency: cold (misses), warm (cache hits) and
+            time-to-first-chunk of streamed synthesis.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List
+
+from benchmarks.common import environment, paragraph_text, parse_list, percentiles, write_book
+from benchmarks.fake_tts import FakeTTSServer
+
+SECTIONS = ("ingest", "reads", "progress", "tts")
+
+
+def configure_environment(root: Path, tts_url: str) -> None:
+    """Point every storage path and the database at ``root``; must run before ``app`` is imported."""
+    storage = root / "storage"
+    os.environ.update(
+        DB_URL=f"sqlite:///{root / 'bench.db'}",
+        STORAGE_ROOT=str(storage),
+        BOOKS_PATH=str(storage / "books"),
+        AUDIO_PATH=str(storage / "audio"),
+        CACHE_PATH=str(storage / "cache"),
+        TTS_OUTPUT_PATH=str(storage / "tts_output"),
+        TTS_API_URL=tts_url,
+        TTS_PREFETCH_ENABLED="false",
+    )
+
+
+def _ingest_case(path: str, mode: str, trace: bool) -> Dict[str, Any]:
+    """Runs in a spawned child process."""
+    from app.services.ingestion import ingestion_service
+
+    if trace:
+        tracemalloc.start()
+    started = time.perf_counter()
+    if mode == "ingest":
+        book = ingestion_service.ingest(Path(path), "bench")
+        paragraphs = sum(len(chapter["paragraphs"]) for chapter in book["chapters"])
+        chapters = len(book["chapters"])
+    else:
+        from app.services.storage import storage_service
+
+        ingestion_service.ingest_to_storage(Path(path), f"bench-{os.getpid()}")
+        toc = storage_service.load_toc(f"bench-{os.getpid()}")
+        paragraphs = sum(chapter["paragraph_count"] for chapter in toc["chapters"])
+        chapters = len(toc["chapters"])
+    seconds = time.perf_counter() - started
+    result = {
+        "seconds": seconds,
+        "paragraphs": paragraphs,
+        "chapters": chapters,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+    if trace:
+        result["traced_peak_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+    return result
+
+
+def bench_ingest(root: Path, formats: List[str], sizes: List[int], trace: bool) -> List[Dict[str, Any]]:
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for fmt in formats:
+        for size in sizes:
+            try:
+                path = write_book(root / f"book-{size}", fmt, size)
+            except ImportError as exc:
+                results.append({"format": fmt, "paragraphs": size, "skipped": str(exc)})
+                continue
+            file_mb = path.stat().st_size / 2**20
+            for mode in ("ingest", "ingest_to_storage"):
+                with context.Pool(1) as pool:
+                    timing = pool.apply(_ingest_case, (str(path), mode, False))
+                entry = {
+                    "format": fmt,
+                    "size": size,
+                    "mode": mode,
+                    "file_mb": file_mb,
+                    **timing,
+                    "paragraphs_per_s": timing["paragraphs"] / timing["seconds"],
+                    "mb_per_s": file_mb / timing["seconds"],
+                }
+                if trace:  # separate run: tracing slows allocation-heavy code down
+                    with context.Pool(1) as pool:
+                        entry["traced_peak_mb"] = pool.apply(_ingest_case, (str(path), mode, True))["traced_peak_mb"]
+                results.append(entry)
+                print(f"ingest {fmt} {size} {mode}: {timing['seconds']:.3f}s", file=sys.stderr)
+    return results
+
+
+def _create_book(root: Path, paragraphs: int) -> str:
+    from app.database import get_session
+    from app.services.books import book_service
+    from app.services.ingestion import ingestion_service
+
+    path = write_book(root / f"read-{paragraphs}", "txt", paragraphs)
+    with get_session() as session:
+        book = book_service.create_book(session, title=path.stem, filename=path.name, content_path=path)
+    ingestion_service.ingest_to_storage(path, book.id, path.stem)
+    return book.id
+
+
+async def bench_reads(client, root: Path, paragraphs: int, requests: int) -> Dict[str, Any]:
+    book_id = _create_book(root, paragraphs)
+    results: Dict[str, Any] = {"paragraphs": paragraphs, "requests": requests}
+    for name, url in (
+        ("book", f"/api/books/{book_id}"),
+        ("toc", f"/api/books/{book_id}/toc"),
+        ("chapter", f"/api/books/{book_id}/chapters/1"),
+    ):
+        samples = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            response = await client.get(url)
+            samples.append(time.perf_counter() - started)
+            response.raise_for_status()
+        results[name] = {"first_request_ms": samples[0] * 1000, **percentiles(samples[1:] or samples)}
+    return results
+
+
+async def bench_progress(client, root: Path, writes: int, concurrency: int) -> Dict[str, Any]:
+    from app.services.progress import progress_buffer
+
+    book_id = _create_book(root, 200)
+    url = f"/api/books/{book_id}/progress"
+
+    started = time.perf_counter()
+    for number in range(writes):
+        (await client.post(url, json={"chapter_id": "1", "paragraph_index": number})).raise_for_status()
+    sequential = time.perf_counter() - started
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def post(number: int) -> int:
+        async with semaphore:
+            response = await client.post(url, json={"chapter_id": "1", "paragraph_index": number})
+            return response.status_code
+
+    started = time.perf_counter()
+    statuses = await asyncio.gather(*(post(number) for number in range(writes)))
+    concurrent = time.perf_counter() - started
+
+    started = time.perf_counter()
+    flushed = await progress_buffer.flush()
+    flush_seconds = time.perf_counter() - started
+    return {
+        "writes": writes,
+        "concurrency": concurrency,
+        "sequential_writes_per_s": writes / sequential,
+        "concurrent_writes_per_s": writes / concurrent,
+        "errors": sum(1 for status in statuses if status != 200),
+        "flush_books": flushed,
+        "flush_ms": flush_seconds * 1000,
+    }
+
+
+async def bench_tts(client, server: FakeTTSServer, requests: int) -> Dict[str, Any]:
+    texts = [paragraph_text(number, words=20) for number in range(requests)]
+
+    async def fan_out() -> Dict[str, Any]:
+        async def one(text: str):
+            started = time.perf_counter()
+            response = await client.post("/api/tts", json={"text": text})
+            return response.status_code, time.perf_counter() - started
+
+        calls_before = server.requests
+        started = time.perf_counter()
+        outcomes = await asyncio.gather(*(one(text) for text in texts))
+        elapsed = time.perf_counter() - started
+        statuses: Dict[str, int] = {}
+        for status, _ in outcomes:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        return {
+            "seconds": elapsed,
+            "requests_per_s": requests / elapsed,
+            "upstream_calls": server.requests - calls_before,
+            "statuses": statuses,
+            **percentiles([seconds for status, seconds in outcomes if status == 200]),
+        }
+
+    cold = await fan_out()
+    warm = await fan_out()
+
+    # Iterate the service directly: in-process ASGI transports buffer the whole body
+    from app.services.tts import tts_service
+
+    long_text = " ".join(f"Sentence number {number} is read aloud here." for number in range(12))
+    started = time.perf_counter()
+    first_byte = None
+    async for _ in tts_service.stream(long_text):
+        if first_byte is None:
+            first_byte = time.perf_counter() - started
+    stream_total = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "upstream_latency_s": server.latency,
+        "cold": cold,
+        "warm": warm,
+        "stream": {"sentences": 12, "first_chunk_ms": (first_byte or 0) * 1000, "total_ms": stream_total * 1000},
+    }
+
+
+async def bench_http(args: argparse.Namespace, root: Path, server: FakeTTSServer) -> Dict[str, Any]:
+    import httpx
+
+    from app.main import app
+
+    results: Dict[str, Any] = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            if "reads" in args.only:
+                results["reads"] = await bench_reads(client, root, args.read_paragraphs, args.read_requests)
+            if "progress" in args.only:
+                results["progress"] = await bench_progress(
+                    client, root, args.progress_writes, args.progress_concurrency
+                )
+            if "tts" in args.only:
+                results["tts"] = await bench_tts(client, server, args.tts_requests)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", default=",".join(SECTIONS), help="comma-separated sections to run")
+    parser.add_argument("--formats", default="txt,docx,epub,pdf")
+    parser.add_argument("--sizes", default="200,2000,20000", help="paragraphs per synthetic book")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="skip the traced-heap ingest runs")
+    parser.add_argument("--read-paragraphs", type=int, default=5000)
+    parser.add_argument("--read-requests", type=int, default=200)
+    parser.add_argument("--progress-writes", type=int, default=1000)
+    parser.add_argument("--progress-concurrency", type=int, default=32)
+    parser.add_argument("--tts-requests", type=int, default=32)
+    parser.add_argument("--tts-latency", type=float, default=0.2, help="fake Coqui latency per request (s)")
+    parser.add_argument("--output", type=Path, help="write JSON here instead of stdout")
+    args = parser.parse_args()
+    args.only = parse_list(args.only)
+
+    server = FakeTTSServer(latency=args.tts_latency).start()
+    report: Dict[str, Any] = {"environment": environment(), "parameters": {**vars(args), "output": None}}
+    try:
+        with tempfile.TemporaryDirectory(prefix="readme-bench-") as tmp:
+            root = Path(tmp)
+            configure_environment(root, server.url)
+            if "ingest" in args.only:
+                report["ingest"] = bench_ingest(
+                    root, parse_list(args.formats), [int(size) for size in parse_list(args.sizes)],
+                    trace=not args.no_tracemalloc,
+                )
+            if set(args.only) & {"reads", "progress", "tts"}:
+                report.update(asyncio.run(bench_http(args, root, server)))
+    finally:
+        server.stop()
+
+    output = json.dumps(report, indent=2, default=str)
+    if args.output:
+        args.output.write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()